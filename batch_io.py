@@ -0,0 +1,104 @@
+"""批次收送的 UDP endpoint
+
+asyncio 預設的 datagram transport 每次 event loop 喚醒只讀一個封包。這裡改用
+non-blocking socket 搭配 loop.add_reader：每次喚醒就用 recvfrom 一直讀到 EAGAIN
+(或達到 max_batch) 為止，整批處理完再把排隊中的回覆一次送出。送出時若 socket
+buffer 已滿，改由 add_writer 等可寫時再送。
+
+Python 沒有提供 recvmmsg/sendmmsg，因此仍是一個封包一次 syscall，每個封包也
+仍會配置一個 bytes (handler 會保留、解碼封包內容)；省下的是每個封包一次的
+event loop 喚醒與 callback 排程。
+"""
+
+import socket
+from collections import deque
+
+MAX_BATCH = 256  # 每次喚醒最多讀取的封包數
+BUFFER_SIZE = 2048  # 每次接收的最大封包大小
+
+def bind_socket(host, port, reuse_port=False):
+    # 建立並綁定 non-blocking 的 UDP socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setblocking(False)
+    sock.bind((host, port))
+    return sock
+
+class BatchedDatagramEndpoint:
+    """提供與 asyncio DatagramTransport 相同的 sendto()/close() 介面"""
+
+    def __init__(self, loop, sock, handler, max_batch=MAX_BATCH, buffer_size=BUFFER_SIZE):
+        self.loop = loop
+        self.sock = sock
+        self.handler = handler  # handler(data, addr) 處理收到的封包
+        self.max_batch = max_batch
+        self.buffer_size = buffer_size
+        self.outbox = deque()  # 等待送出的 (data, addr)
+        self.draining = False  # 是否正在處理一批封包 (期間的回覆等整批結束再送)
+        self.flush_scheduled = False
+        self.writing = False  # 是否正在等待 socket 可寫
+        self.loop.add_reader(self.sock.fileno(), self.on_readable)
+
+    def on_readable(self):
+        # 讀到 EAGAIN 為止，再依序處理並一次送出所有回覆
+        received = []
+        recvfrom = self.sock.recvfrom
+        buffer_size = self.buffer_size
+        for _ in range(self.max_batch):
+            try:
+                received.append(recvfrom(buffer_size))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break  # 例如 ICMP port unreachable，下次喚醒再繼續讀
+
+        self.draining = True
+        try:
+            for data, addr in received:
+                self.handler(data, addr)
+        finally:
+            self.draining = False
+        self.flush()
+
+    def sendto(self, data, addr):
+        # 回覆先排隊；不是在處理封包時產生的回覆 (例如 timeout 通知) 排到下一輪送出
+        self.outbox.append((data, addr))
+        if not self.draining and not self.flush_scheduled and not self.writing:
+            self.flush_scheduled = True
+            self.loop.call_soon(self.flush)
+
+    def get_write_buffer_size(self):
+        # 與 asyncio transport 相同：尚未送出的位元組數
+        return sum(len(data) for data, _ in self.outbox)
+
+    def flush(self):
+        # 送出所有排隊的回覆，socket buffer 滿了就等可寫時再繼續
+        self.flush_scheduled = False
+        sendto = self.sock.sendto
+        outbox = self.outbox
+        while outbox:
+            data, addr = outbox[0]
+            try:
+                sendto(data, addr)
+            except (BlockingIOError, InterruptedError):
+                if not self.writing:
+                    self.writing = True
+                    self.loop.add_writer(self.sock.fileno(), self.on_writable)
+                return
+            except OSError:
+                pass  # 無法送達的位址直接丟棄
+            outbox.popleft()
+
+    def on_writable(self):
+        self.loop.remove_writer(self.sock.fileno())
+        self.writing = False
+        self.flush()
+
+    def close(self):
+        if self.sock.fileno() >= 0:
+            self.loop.remove_reader(self.sock.fileno())
+            if self.writing:
+                self.loop.remove_writer(self.sock.fileno())
+        self.sock.close()
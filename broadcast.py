@@ -0,0 +1,243 @@
+"""觀戰者 (spectator) 的即時廣播
+
+任何 client 都可以訂閱 (不需要先連線遊戲)，訂閱分兩步：
+    1. 送出 "[Subscribe]: guesses,rankings"，伺服器只回覆
+       "[Subscribed]: <主題>;token=<token>"，不會開始廣播
+    2. 帶著 token 再送一次 "[Subscribe]: guesses,rankings;token=<token>"，伺服器
+       回覆 "[Subscribed]: <主題>;token=<token>;lease=<秒數>" 後開始廣播
+token 由來源位址計算 (伺服器不為未確認的請求保存狀態)，只有真的收得到回覆的
+位址才能開始接收廣播，偽造來源位址的請求無法讓伺服器向第三者送出大量封包。
+之後收到 "[Broadcast]:" 開頭、每行一個事件的封包：
+    guesses   每次猜測的結果 (session id、猜測、回覆)
+    rankings  登上排行榜的玩家與該長度最新的前幾名
+訂閱在 lease 秒後失效，觀戰者需帶著 token 定期重新訂閱；
+"[Unsubscribe]: token=<token>" 立即取消。同時訂閱的觀戰者最多 MAX_SUBSCRIBERS 個。
+
+每個觀戰者最多落後 SUBSCRIBER_QUEUE 筆事件，超過時丟棄最舊的事件；同一個 key
+的事件 (例如同一長度的排行榜) 只保留最新的一筆。伺服器每 BROADCAST_INTERVAL
+秒把尚未送出的事件合併成接近 datagram 上限的封包送出，每個觀戰者每次最多
+MAX_PACKETS_PER_FLUSH 個封包，送出的 backlog 過多時延後；觀戰者再慢也只會
+掉事件，不會拖慢遊戲的回覆。
+多 worker 模式 (--workers) 不支援觀戰：每個 worker 只看得到部分的遊戲，
+訂閱請求會收到 [Error] 回覆。
+
+也可以直接執行本模組觀看伺服器的事件：
+    python broadcast.py --port 5000
+"""
+
+import argparse
+import hmac
+import os
+import socket
+import time
+from collections import Counter, deque
+
+import wire
+
+TOPICS = ("guesses", "rankings")
+HEADER = b"[Broadcast]:\n"
+SUBSCRIBER_QUEUE = 1024  # 每個觀戰者最多落後的事件數，超過時丟棄最舊的事件
+BROADCAST_INTERVAL = 0.1  # 合併送出事件的間隔 (秒)
+MAX_PACKETS_PER_FLUSH = 8  # 每次每個觀戰者最多送出的封包數，其餘留到下一次
+BACKLOG_LIMIT = 256 * 1024  # socket 尚未送出的資料超過此位元組數時延後廣播
+SUBSCRIPTION_LEASE = 60.0  # 訂閱有效的秒數
+MAX_SUBSCRIBERS = 1024  # 同時訂閱的觀戰者上限
+TOKEN_LENGTH = 16  # 訂閱 token 的 hex 字元數
+
+def parse_topics(text):
+    # 解析 "guesses,rankings"，空白時訂閱全部主題；有不認得的主題時回傳 None
+    topics = tuple(t.strip() for t in text.split(",") if t.strip()) or TOPICS
+    return topics if all(t in TOPICS for t in topics) else None
+
+class Subscriber:
+    def __init__(self, addr, topics, expires_at, cursor):
+        self.addr = addr
+        self.topics = topics
+        self.expires_at = expires_at
+        self.cursor = cursor  # 下一個要送出的事件序號
+        self.dropped = 0  # 落後太多而跳過的事件數 (以共用紀錄計算，含未訂閱主題的事件)
+
+class Broadcaster:
+    """所有觀戰者共用一份有上限的事件紀錄，每個觀戰者只記錄自己讀到的位置
+
+    發布事件只需 O(1)，不論觀戰者有多少；觀戰者落後超過 capacity 筆時，最舊的
+    事件直接跳過 (等同每個觀戰者有一個滿了就丟棄最舊事件的佇列)。位置與主題
+    相同的觀戰者共用同一批組好的封包。
+    """
+
+    def __init__(self, send, chunk_bytes, capacity=SUBSCRIBER_QUEUE, max_packets=MAX_PACKETS_PER_FLUSH,
+                 lease=SUBSCRIPTION_LEASE, max_subscribers=MAX_SUBSCRIBERS, clock=time.monotonic):
+        self.send = send  # send(data, addr)
+        self.chunk_bytes = chunk_bytes  # 每個封包的內容上限
+        self.capacity = capacity
+        self.max_packets = max_packets
+        self.lease = lease
+        self.max_subscribers = max_subscribers
+        self.clock = clock
+        self.secret = os.urandom(16)  # 計算訂閱 token 的金鑰，每次啟動重新產生
+        self.subscribers = {}  # addr → Subscriber
+        self.topic_counts = Counter()  # 主題 → 訂閱的觀戰者數
+        self.events = deque()  # (主題, key, 編碼好的各行)；被同 key 新事件取代的為 None
+        self.first = 0  # events[0] 的序號
+        self.latest = {}  # key → 該 key 最新事件的序號
+        self.dropped = 0  # 已離開的觀戰者跳過的事件數 (加上目前觀戰者的即為總數)
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    @property
+    def end(self):
+        # 下一個事件的序號
+        return self.first + len(self.events)
+
+    def token(self, addr):
+        # 來源位址的訂閱 token (不保存狀態，由金鑰與位址計算)
+        return hmac.new(self.secret, f"{addr[0]}:{addr[1]}".encode(), "sha256").hexdigest()[:TOKEN_LENGTH]
+
+    def check_token(self, addr, token):
+        return bool(token) and hmac.compare_digest(self.token(addr), token)
+
+    def subscribe(self, addr, topics):
+        # 新增或續約訂閱 (可改變主題)；新的觀戰者從下一個事件開始接收，已達上限時回傳 None
+        # 呼叫端須先以 check_token 確認來源位址
+        subscriber = self.subscribers.get(addr)
+        if subscriber is None:
+            if len(self.subscribers) >= self.max_subscribers:
+                self.prune()
+                if len(self.subscribers) >= self.max_subscribers:
+                    return None
+            subscriber = self.subscribers[addr] = Subscriber(addr, (), 0, self.end)
+        self.topic_counts.subtract(subscriber.topics)
+        self.topic_counts.update(topics)
+        subscriber.topics = topics
+        subscriber.expires_at = self.clock() + self.lease
+        return subscriber
+
+    def unsubscribe(self, addr):
+        subscriber = self.subscribers.pop(addr, None)
+        if subscriber:
+            self.topic_counts.subtract(subscriber.topics)
+            self.dropped += subscriber.dropped
+
+    def prune(self):
+        # 移除 lease 已過期的訂閱
+        now = self.clock()
+        for addr in [addr for addr, s in self.subscribers.items() if s.expires_at < now]:
+            self.unsubscribe(addr)
+
+    def total_dropped(self):
+        return self.dropped + sum(s.dropped for s in self.subscribers.values())
+
+    def wants(self, topic):
+        return self.topic_counts[topic] > 0
+
+    def publish(self, topic, lines, key=None):
+        # 加入一個事件 (不送出封包)；key 相同的舊事件若還沒被讀取就不再送出
+        if not self.wants(topic):
+            return False
+        if key is not None:
+            index = self.latest.get(key)
+            if index is not None and index >= self.first:
+                self.events[index - self.first] = None
+            self.latest[key] = self.end
+        self.events.append((topic, key, tuple(line.encode() for line in lines)))
+        if len(self.events) > self.capacity:
+            self.events.popleft()
+            self.first += 1
+        return True
+
+    def pending(self):
+        end = self.end
+        return any(s.cursor < end for s in self.subscribers.values())
+
+    def take_packets(self, cursor, topics):
+        # 從 cursor 起依序把 topics 的事件組成封包 (內容不超過 chunk_bytes)，回傳 (封包, 新的 cursor)；
+        # 事件不會拆到兩次送出，因此最後一個事件可能多用一個封包
+        packets = []
+        current = [HEADER]
+        size = 0
+        end = self.end
+        while cursor < end and len(packets) < self.max_packets:
+            item = self.events[cursor - self.first]
+            cursor += 1
+            if item is None or item[0] not in topics:
+                continue
+            for line in item[2]:
+                if size and size + len(line) > self.chunk_bytes:
+                    packets.append(b"".join(current))
+                    current = [HEADER]
+                    size = 0
+                current.append(line)
+                size += len(line)
+        if size:
+            packets.append(b"".join(current))
+        return packets, cursor
+
+    def flush(self):
+        # 送出各觀戰者尚未讀取的事件並移除過期的訂閱，回傳送出的封包數
+        now = self.clock()
+        end = self.end
+        batches = {}  # (cursor, 主題) → (封包, 新的 cursor)，位置相同的觀戰者共用
+        sent = 0
+        for addr, subscriber in list(self.subscribers.items()):
+            if subscriber.expires_at < now:
+                self.unsubscribe(addr)
+                continue
+            if subscriber.cursor < self.first:
+                subscriber.dropped += self.first - subscriber.cursor
+                subscriber.cursor = self.first
+            if subscriber.cursor >= end:
+                continue
+            batch_key = (subscriber.cursor, subscriber.topics)
+            batch = batches.get(batch_key)
+            if batch is None:
+                batch = batches[batch_key] = self.take_packets(subscriber.cursor, subscriber.topics)
+            packets, subscriber.cursor = batch
+            for data in packets:
+                self.send(data, addr)
+                sent += 1
+        return sent
+
+def watch(host, port, topics, lease=SUBSCRIPTION_LEASE):
+    # 訂閱並持續輸出事件，收到 token 後立即帶著 token 確認，lease 過一半時重新訂閱
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(lease / 2)
+    request = f"[Subscribe]: {','.join(topics)}"
+    token = None
+    try:
+        while True:
+            sock.sendto((f"{request};token={token}" if token else request).encode(), (host, port))
+            renew_at = time.monotonic() + lease / 2
+            while time.monotonic() < renew_at:
+                try:
+                    text = sock.recv(4096).decode()
+                except socket.timeout:
+                    break
+                if text.startswith("[Broadcast]:"):
+                    print(text.partition("\n")[2], end="", flush=True)
+                elif text.startswith("[Subscribed]:"):
+                    options = wire.parse_options(wire.split_seq(text)[0])
+                    if "lease" not in options:  # 只拿到 token，帶著 token 再訂閱一次才開始廣播
+                        token = options.get("token")
+                        break
+                else:
+                    print(wire.split_seq(text)[0], flush=True)
+    finally:
+        sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="觀看 UDP猜字串 伺服器的即時事件")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--topics", default=",".join(TOPICS), help=f"訂閱的主題 ({', '.join(TOPICS)})")
+    args = parser.parse_args()
+    topics = parse_topics(args.topics)
+    if topics is None:
+        parser.error(f"主題應為 {', '.join(TOPICS)}")
+    try:
+        watch(args.host, args.port, topics)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
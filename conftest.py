@@ -0,0 +1,13 @@
+import pytest
+
+class FakeClock:
+    # 可手動推進的時鐘，傳給接受 clock 參數的類別
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,364 @@
+"""不依賴 Tkinter 的遊戲 client 核心
+
+GameClient 在 asyncio event loop 上處理連線握手、接收封包、請求重送與閒置
+timeout。socket 綁定系統配發的 ephemeral port，同一台電腦可以同時開多個 client。
+握手時若沒收到 [Ack]，以指數退避 (INITIAL_BACKOFF 起每次加倍) 重送 [Connecting]。
+
+遊戲事件以 on_<event> 方法通知已註冊的 observer (與 GameServer 相同)：
+    on_log(text, tag)     要顯示的訊息
+    on_connected()        握手成功
+    on_connect_failed()   重試多次後仍無法連線
+    on_ready(length)      伺服器已設定答案，可以開始猜
+    on_win()              猜中答案
+    on_closed()           連線已結束 (timeout 或離開)
+observer 的方法在 event loop 的執行緒上被呼叫，GUI 須自行轉交給 Tk 執行緒
+(例如 LogPane.post，內部以 after() 執行)；其他執行緒呼叫 GameClient 的方法時
+須透過 loop.call_soon_threadsafe。
+"""
+
+import asyncio
+
+import wire
+from reliability import Retransmitter
+from scoring import DIGIT_VALUE, HEX_DIGITS
+from timer_wheel import TimerWheel
+
+TIMEOUT_DURATION = 120  # 玩家若 120 秒內沒動作就 timeout
+CONNECT_ATTEMPTS = 6  # 握手最多送幾次 [Connecting]
+INITIAL_BACKOFF = 0.25  # 第一次等待 [Ack] 的秒數，之後每次加倍
+MAX_BACKOFF = 2.0
+POLL_INTERVAL = 0.1  # 檢查請求是否需要重送的間隔 (秒)
+
+class ClientProtocol(asyncio.DatagramProtocol):
+    """將 asyncio 收到的 datagram 轉交給 GameClient"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client.handle_datagram(data)
+
+    def error_received(self, exc):
+        pass  # 例如伺服器尚未啟動時的 ICMP port unreachable，交給重送處理
+
+class GameClient:
+    def __init__(self, username, requested_length=None, timeout_duration=TIMEOUT_DURATION):
+        self.username = username
+        self.requested_length = requested_length  # 要求伺服器自動出題的答案長度 (選填)
+        self.loop = None  # 執行中的 event loop
+        self.transport = None  # 連到伺服器的 datagram transport
+        self.local_address = None  # 系統配發的 (ip, port)
+        self.connected = False
+        self.ack_waiter = None  # 握手時等待 [Ack] 的 future
+        self.binary = False  # 伺服器是否同意使用二進位封包 (wire.py)
+        self.session_id = 0  # 二進位封包使用的 session id
+        self.token = ""  # 伺服器在 [Ack] 配發的 token，查詢排行榜時帶回
+        self.retransmitter = None  # 需要回覆的請求的序號與重送
+        self.observers = []
+
+        # 猜數字相關參數
+        self.ready_to_guess = False
+        self.answer_length = 0
+        self.guess_count = 0
+        self.pending_guesses = {}  # 已送出、尚未收到回覆的猜測：seq → 猜測
+        self.guess_history = []  # 本局的 (猜測, A, B)，供提示使用
+        self.ranking_parts = {}  # 排行榜回覆的序號 → {段落編號: 內容}
+
+        # timeout計時器相關
+        self.TIMEOUT_DURATION = timeout_duration
+        self.idle_timer = TimerWheel(timeout_duration, lambda key: self.handle_idle_timeout())
+        self.timer_handle = None
+        self.poll_handle = None
+
+    # ===== observer 相關 =====
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def notify(self, event, *args):
+        # 呼叫每個 observer 的 on_<event>(*args)，沒有實作的 observer 直接略過
+        for observer in self.observers:
+            handler = getattr(observer, f"on_{event}", None)
+            if handler:
+                handler(*args)
+
+    def log(self, text, tag=None):
+        self.notify("log", text, tag)
+
+    # ===== 連線相關 =====
+    async def connect(self, host, port):
+        """建立 socket 並完成握手，回傳是否成功"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: ClientProtocol(self), remote_addr=(host, port))
+        except OSError as e:
+            self.log(f"[Error]: {e}\n", "error")
+            self.notify("connect_failed")
+            return False
+        self.local_address = self.transport.get_extra_info("sockname")
+        self.retransmitter = Retransmitter(self.transport.sendto)
+        self.log(f"[Info]: 正在確認連線{self.local_address[0]}:{self.local_address[1]}->{host}:{port}\n")
+
+        length_option = f";len={self.requested_length}" if self.requested_length else ""
+        hello = f"[Connecting]: client->{host}:{port};proto={wire.CAPABILITY}{length_option}".encode()
+        delay = INITIAL_BACKOFF
+        for _ in range(CONNECT_ATTEMPTS):
+            self.ack_waiter = self.loop.create_future()
+            self.transport.sendto(hello)
+            try:
+                await asyncio.wait_for(self.ack_waiter, delay)
+                return True
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, MAX_BACKOFF)
+        self.ack_waiter = None
+        self.log("[Error]: 連線失敗，請確認伺服器是否啟動\n", "error")
+        self.transport.close()
+        self.transport = None
+        self.notify("connect_failed")
+        return False
+
+    def accept_ack(self, ack):
+        # 收到 [Ack]：記下協商結果並開始計時 (緊接著的 [Ready] 也能正常處理)
+        options = wire.parse_options(ack)
+        self.binary = options.get("proto") == wire.CAPABILITY
+        self.session_id = int(options.get("sid", 0))
+        self.token = options.get("token", "")
+        self.connected = True
+        self.log(f"[Connection Success!]: 伺服器回應為: {ack.split(';')[0]}\n", "success")
+        self.log("[Success]: 已連線到伺服器，等待Server設定答案...\n", "success")
+        self.guess_count = 0
+        self.touch()
+        self.tick_timer()
+        self.poll_retransmit()
+        self.notify("connected")
+
+    def close(self):
+        """關閉 socket 並停止所有計時"""
+        self.connected = False
+        self.ready_to_guess = False
+        self.idle_timer.discard("game")
+        if self.timer_handle:
+            self.timer_handle.cancel()
+            self.timer_handle = None
+        if self.poll_handle:
+            self.poll_handle.cancel()
+            self.poll_handle = None
+        if self.retransmitter:
+            self.retransmitter.clear()
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+            self.log("[Info]: 客戶端socket已關閉\n", "info")
+        self.notify("closed")
+
+    # ===== 送出請求 =====
+    def send_guess(self, guess):
+        """檢查並送出猜測值"""
+        guess = guess.strip().upper()
+        self.touch()
+        if not self.ready_to_guess:
+            self.log("[Waiting...]: 等待Server設定答案\n")
+            return
+        if any(c not in HEX_DIGITS for c in guess):
+            self.log("[Error]: 請只輸入0-9或A-F的字元\n", "error")
+            return
+        if len(set(guess)) != len(guess):
+            self.log("[Error]: 請確認輸入字元皆不重複\n", "error")
+            return
+        if len(guess) != self.answer_length:
+            self.log(f"[Error]: 請輸入{self.answer_length}個字元\n", "error")
+            return
+
+        self.guess_count += 1
+        values = [DIGIT_VALUE[c] for c in guess]
+
+        def build(seq):
+            self.pending_guesses[seq] = guess  # 回覆以 seq 對應回這個猜測
+            return wire.pack_guess(self.session_id, seq, values) if self.binary else f"[Guess]: {guess} #{seq}".encode()
+
+        try:
+            self.retransmitter.submit(build)
+            self.log(f"[Info]: 已送出猜測({guess})\n", "info")
+        except OSError as e:
+            self.log(f"[Error]: 傳送失敗({e})\n", "error")
+
+    def replay(self):
+        """要求重新開始一局"""
+        if not self.connected:
+            return
+        self.touch()
+        self.retransmitter.submit(
+            lambda seq: wire.pack_seq(wire.OP_REPLAY, self.session_id, seq) if self.binary
+            else wire.with_seq(f"[Replay]:{self.local_address}", seq).encode())
+        self.log("[Replay Requesting]已請求重新開始，請稍候Server設定新答案...\n", "info")
+
+    def request_rankings(self):
+        """查詢目前答案長度排行榜的前10名與自己的名次"""
+        if not self.connected:
+            return
+        self.touch()
+        length = f";len={self.answer_length}" if self.answer_length else ""
+        length += f";token={self.token}"
+        self.retransmitter.submit(lambda seq: wire.with_seq(f"[Rankings]: top;k=10{length}", seq).encode())
+        self.retransmitter.submit(
+            lambda seq: wire.with_seq(f"[Rankings]: user;name={self.username}{length}", seq).encode())
+
+    async def quit(self):
+        """傳送QUIT給伺服器並關閉連線"""
+        if self.connected:
+            try:
+                self.send_control("QUIT", wire.OP_QUIT)
+            except OSError as e:
+                self.log(f"[Error]: 傳送QUIT失敗: {e}\n", "error")
+        self.close()
+
+    def send_control(self, text, opcode):
+        """送出沒有內容的控制封包，已協商二進位格式時改送對應的opcode"""
+        if self.binary:
+            self.transport.sendto(wire.pack(opcode, self.session_id))
+        else:
+            self.transport.sendto(text.encode())
+
+    # ===== 封包處理 =====
+    def handle_datagram(self, data):
+        """處理伺服器的所有訊息"""
+        if not self.connected:
+            if data.startswith(b"[Ack]:") and self.ack_waiter is not None and not self.ack_waiter.done():
+                self.accept_ack(data.decode())
+                self.ack_waiter.set_result(True)
+            return
+        self.touch()
+        try:
+            if wire.is_binary(data):
+                self.handle_binary(data)
+                return
+            response, seq = wire.split_seq(data.decode())
+            if response.startswith("[Rankings]:"):
+                self.retransmitter.ack(seq)  # 同一個查詢的回覆可能分成多個封包
+                self.handle_rankings(seq, response)
+                return
+            if seq is not None and not self.retransmitter.ack(seq):
+                return  # 重複或過期的回覆
+
+            if response.startswith("[Ready]:"):
+                self.handle_ready(int(response.split(":")[1].split("，")[0]))
+            elif response.startswith("[Guess Reply]:") and "恭喜猜對" in response:
+                self.record_reply(seq, wire.parse_score(response))
+                self.handle_win()
+            elif response.startswith("[Guess Reply]"):
+                self.record_reply(seq, wire.parse_score(response))
+                self.log(f"{response}\n", 'bold')
+            elif response.startswith("[Congratulations!]:"):
+                self.log(f"{response.split(':')[1].strip()}\n", 'bold')
+            elif response.startswith("[Timeout]:"):
+                self.handle_server_timeout(response)
+            elif response.startswith("[Error]:"):
+                self.log(f"{response}\n", "error")
+        except (ValueError, IndexError):
+            pass  # 格式不符的封包直接略過
+
+    def handle_binary(self, data):
+        """處理二進位格式的伺服器回應"""
+        opcode, session_id, body = wire.unpack(data)
+        if session_id != self.session_id:
+            return
+        if opcode in (wire.OP_REPLY, wire.OP_ERROR, wire.OP_ACK):
+            seq = wire.unpack_seq(body)
+            if not self.retransmitter.ack(seq):
+                return  # 重複或過期的回覆
+        if opcode == wire.OP_READY:
+            self.handle_ready(wire.READY_BODY.unpack(body)[0])
+        elif opcode == wire.OP_REPLY:
+            _, A, B = wire.REPLY_BODY.unpack(body)
+            self.record_reply(seq, (A, B))
+            if A == self.answer_length:
+                self.handle_win()
+            else:
+                self.log(f"[Guess Reply]: {A}A{B}B\n", 'bold')
+        elif opcode == wire.OP_ERROR:
+            self.record_reply(seq, None)
+            self.log(f"[Guess Reply]: {body[wire.SEQ_BODY.size:].decode()}\n", 'bold')
+        elif opcode == wire.OP_TIMEOUT:
+            self.handle_server_timeout("[Timeout]: Server已閒置過久，自動中止遊戲")
+
+    def handle_ready(self, length):
+        """伺服器已設定答案，開始計算猜測次數"""
+        self.ready_to_guess = True
+        self.answer_length = length
+        self.guess_count = 0
+        self.pending_guesses.clear()
+        self.guess_history = []
+        self.log(f"[Info]: Server已設定答案(長度{self.answer_length})，可開始猜測\n", "info")
+        self.notify("ready", length)
+
+    def record_reply(self, seq, score):
+        """把回覆對應到序號相同的猜測；score 為 None 表示該猜測被伺服器拒絕"""
+        guess = self.pending_guesses.pop(seq, None)
+        if guess is not None and score is not None:
+            self.guess_history.append((guess, *score))
+
+    def handle_win(self):
+        """猜對答案：顯示結果並回報名稱給伺服器 (次數與用時由伺服器記錄)"""
+        self.ready_to_guess = False
+        self.log(f"[Game Finish!]: 共猜{self.guess_count}次\n", "bold")
+        self.log("若要再次遊玩請點下方「再玩一次」或按「結束遊戲」離開\n", "success")
+        userinfo_msg = f"[USERINFO]->{self.username}"
+        self.retransmitter.submit(lambda seq: wire.with_seq(userinfo_msg, seq).encode())
+        self.notify("win")
+
+    def handle_rankings(self, seq, response):
+        """收集排行榜回覆的各段，全部到齊後一次顯示"""
+        header, _, body = response.partition("\n")
+        if header.startswith("[Rankings]: token="):
+            # 伺服器不接受目前的 token (例如伺服器已重新啟動)：換成新的 token 重新查詢一次
+            token = header.partition("=")[2].strip()
+            if token != self.token:
+                self.token = token
+                self.request_rankings()
+            return
+        index, _, total = header.split(":", 1)[1].split()[0].partition("/")
+        parts = self.ranking_parts.setdefault(seq, {})
+        parts[int(index)] = body
+        if len(parts) == int(total):
+            del self.ranking_parts[seq]
+            text = "".join(parts[i].rstrip("\n") + "\n" for i in sorted(parts))
+            self.log(f"[Rankings]: {header.split()[-1]}\n{text}", "bold")
+
+    def handle_server_timeout(self, response):
+        """伺服器通知timeout：結束遊戲並關閉socket"""
+        self.log(f"{response}\n", "error")
+        self.close()
+
+    # ===== timeout 相關 =====
+    def touch(self):
+        """重設閒置計時器（只更新期限）"""
+        self.idle_timer.touch("game")
+
+    def tick_timer(self):
+        """每個 tick 推進閒置計時器，到期時呼叫 handle_idle_timeout"""
+        self.idle_timer.advance()
+        if self.connected:
+            self.timer_handle = self.loop.call_later(self.idle_timer.tick, self.tick_timer)
+
+    def poll_retransmit(self):
+        """定期檢查是否有請求需要重送"""
+        try:
+            seq = self.retransmitter.poll()
+            if seq is not None:
+                self.pending_guesses.pop(seq, None)  # 放棄的猜測不會有回覆，不再等待
+                self.log("[Error]: 伺服器多次未回應，請求已放棄\n", "error")
+        except OSError as e:
+            self.log(f"[Error]: 重送失敗({e})\n", "error")
+        if self.connected:
+            self.poll_handle = self.loop.call_later(POLL_INTERVAL, self.poll_retransmit)
+
+    def handle_idle_timeout(self):
+        """處理 timeout（玩家太久沒動作自動結束）"""
+        if not self.connected:
+            return
+        self.log(f"[Timeout]: {self.TIMEOUT_DURATION}秒內無操作，遊戲自動結束\n", "error")
+        try:
+            self.send_control("[Timeout]: Client已閒置過久，自動中止遊戲", wire.OP_TIMEOUT)
+        except OSError as e:
+            self.log(f"[Error]: 傳送timeout通知失敗: {e}\n", "error")
+        self.close()
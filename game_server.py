@@ -0,0 +1,913 @@
+import asyncio
+import argparse
+import itertools
+import json
+import random
+import struct
+import time
+from collections import deque
+from datetime import datetime
+import wire
+from reliability import is_newer
+from scoring import HEX_DIGITS
+from score_table import scorer_for
+from ranking_store import RankingStore
+from ranking_backends import BACKENDS, GROUP_COMMIT_DELAY
+from timer_wheel import TimerWheel
+from batch_io import BatchedDatagramEndpoint, bind_socket
+from metrics import Metrics
+from session_log import EventRecorder, RECORD_FLUSH_INTERVAL, read_records, recorded_answers
+from broadcast import Broadcaster, parse_topics, BACKLOG_LIMIT, BROADCAST_INTERVAL
+from rate_limit import TokenBuckets, DEFAULT_RATE, DEFAULT_HOST_RATE
+
+TIMEOUT_DURATION = 120  # 2 分鐘無動作 timeout
+ALLOWED_CHARS = HEX_DIGITS
+MIN_LENGTH = 1  # 答案長度下限
+MAX_LENGTH = len(HEX_DIGITS)  # 答案長度上限 (字元不可重複)
+MAX_NAME_LENGTH = 32  # 排行榜名稱長度上限
+RANKING_PAGE_SIZE = 10  # [Rankings] 查詢預設筆數，也是猜中時伺服器顯示的前幾名
+MAX_RANKING_QUERY = 100  # [Rankings] 單次查詢的筆數上限
+DEFAULT_RANKING_LENGTH = 4  # [Rankings] 未指定長度且 session 尚無答案時查詢的長度
+DEFAULT_AUTO_LENGTH = 4  # headless 模式沒有指定 --answer 或 --auto-length 時自動出題的長度 (沒有操作者可以設定答案)
+RANKING_CHUNK_BYTES = 960  # 每個 [Rankings]/[Stats] 回覆封包的內容上限 (client 接收 buffer 為 1024)
+METRICS_INTERVAL = 10.0  # 定期寫出 metrics JSON 的間隔 (秒)
+RANKING_LOAD_POLL = 0.05  # 排行榜載入期間檢查是否載入完成的間隔 (秒)
+LOCAL_HOSTS = ("127.0.0.1", "::1")  # 允許查詢 [Stats] 的來源位址
+MAX_SESSIONS = 65536  # 同時存在的 session 上限，達到上限時不再為新的位址建立 session
+MAX_REQUEST_BYTES = 512  # client 請求的長度上限，超過的封包不解碼直接丟棄
+REQUEST_PREFIXES = (  # 文字請求的開頭，其他開頭的封包 (二進位封包除外) 不解碼直接丟棄
+    b"[Connecting]:", b"[Guess]:", b"[USERINFO]", b"[Rankings]:", b"[Stats]:", b"[Subscribe]:", b"[Unsubscribe]",
+    b"[Replay]:", b"[Timeout]:", b"QUIT",
+)
+BINARY_OPCODE_NAMES = {
+    wire.OP_GUESS: "bin.guess", wire.OP_REPLAY: "bin.replay", wire.OP_TIMEOUT: "bin.timeout", wire.OP_QUIT: "bin.quit",
+}
+
+class GameSession:
+    def __init__(self, address, session_id):
+        # 單一 client 的遊戲狀態，以 (ip, port) 區分
+        self.address = address  # client 的地址
+        self.session_id = session_id  # 二進位封包中用來核對的 session id
+        self.binary = False  # 是否已協商使用二進位封包 (wire.py)
+        self.requested_length = None  # client 要求的答案長度 (自動出題時使用)
+        self.replay_answers = None  # replay.py 重播時，錄到的各局答案 (deque，依序使用)
+        self.answer = ""  # 正確答案
+        self.answer_length = 0  # 答案長度
+        self.scorer = None  # 預先編碼好的答案 (AnswerScorer 或查表的 TableScorer)
+        self.guess_count = 0  # 本局已猜次數
+        self.ready_at = None  # 送出 [Ready] 的時間 (monotonic)
+        self.won_at = None  # 猜中答案的時間 (monotonic)，尚未猜中為 None
+        self.finish_time = None  # 猜中答案的時刻 (顯示用的牆上時間)
+        self.recorded = False  # 本局成績是否已登記到排行榜
+        self.last_seq = None  # 最後處理的請求序號 (舊版 client 不帶序號)
+        self.last_response = None  # 最後一次回覆的封包 (list)，收到重複請求時直接重送
+
+def validate_answer(answer, length):
+    # 驗證答案格式，錯誤時回傳錯誤訊息，正確則回傳 None
+    if len(answer) != length:
+        return f"答案長度應為 {length} 位"
+    if any(c not in ALLOWED_CHARS for c in answer):
+        return "請確認答案僅包含0~9或A~F"
+    if len(set(answer)) != length:
+        return "答案中有重複字元"
+    return None
+
+def generate_answer(length, rng=random):
+    # 從 0~9A~F 中隨機取出 length 個不重複字元作為答案
+    if not MIN_LENGTH <= length <= MAX_LENGTH:
+        raise ValueError(f"答案長度應介於 {MIN_LENGTH}~{MAX_LENGTH}")
+    return "".join(rng.sample(ALLOWED_CHARS, length))
+
+def clean_name(name):
+    # 移除控制字元以及 ";"、"#" (協定的選項與序號分隔符)，名稱會原樣出現在排行榜與廣播的回覆中
+    return "".join(c for c in name if c.isprintable() and c not in ";#").strip()[:MAX_NAME_LENGTH]
+
+def format_ranking(rank, rec):
+    return f"{rank}. {rec['name']} - {rec['guesses']} 次, {rec['time']} 秒, 完成時間：{rec['finish_time']}\n"
+
+def chunk_lines(lines, limit):
+    # 將多行文字依 UTF-8 位元組數切成不超過 limit 的數段
+    chunks = []
+    current = []
+    size = 0
+    for line in lines:
+        line_size = len(line.encode())
+        if current and size + line_size > limit:
+            chunks.append("".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += line_size
+    chunks.append("".join(current))
+    return chunks
+
+def chunk_packets(tag, lines, seq, note=""):
+    # 將多行文字切成 "[tag]: i/n<note>" 開頭、datagram 大小的回覆封包
+    chunks = chunk_lines(lines, RANKING_CHUNK_BYTES)
+    return [wire.with_seq(f"[{tag}]: {i}/{len(chunks)}{note}\n{chunk}", seq).encode()
+            for i, chunk in enumerate(chunks, 1)]
+
+def parse_length(value):
+    # 解析 client 要求的答案長度，不合法時回傳 None
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        return None
+    return length if MIN_LENGTH <= length <= MAX_LENGTH else None
+
+class GameServer:
+    """不依賴 Tkinter 的遊戲核心，處理 [Connecting]/[Guess]/[USERINFO]/[Replay]/[Timeout]/QUIT 封包
+
+    所有方法都在 asyncio event loop 的執行緒上執行；GUI 等外部執行緒須透過
+    loop.call_soon_threadsafe 呼叫。遊戲事件以 on_<event> 方法通知已註冊的 observer。
+    """
+
+    def __init__(self, default_answer=None, auto_length=None, timeout_duration=TIMEOUT_DURATION, rankings=None,
+                 metrics_file=None, metrics_interval=METRICS_INTERVAL, profile_interval=None, record_file=None,
+                 rate_limit=DEFAULT_RATE, host_rate_limit=DEFAULT_HOST_RATE, spectators=True, replay_answers=None,
+                 max_sessions=MAX_SESSIONS):
+        self.loop = None  # 執行中的 event loop
+        self.transport = None  # asyncio datagram transport
+        self.sessions = {}  # 以 (ip, port) 為 key 的所有遊戲 session
+        self.max_sessions = max_sessions  # session 數上限 (大量偽造的來源位址不會無限制地佔用記憶體)
+        self.session_ids = itertools.count(1)  # 配發 session id
+        self.pending_sessions = deque()  # 等待設定答案的 session (先到先設定)
+        self.observers = []  # 觀察遊戲事件的物件 (例如 ServerGUI)
+        self.default_answer = default_answer  # 若有設定，新 session 直接使用此答案
+        self.auto_length = auto_length  # 若有設定，新 session 自動產生此長度的答案 (client 可另外指定長度)
+        self.rng = random.Random()  # 自動出題用的亂數產生器
+        self.TIMEOUT_DURATION = timeout_duration
+        self.idle_timers = TimerWheel(timeout_duration, self.handle_timeout)  # 所有 session 共用的閒置計時
+        self.timer_handle = None  # 驅動 idle_timers 的 call_later handle
+        self.flush_handle = None  # 排行榜延遲提交的 call_later handle
+        if rankings is None:
+            rankings = RankingStore()
+        self.rankings = rankings  # 排行榜紀錄 (多程序模式下為 worker_pool.RemoteRankingStore)，在 start() 綁定後才於背景載入
+        self.rankings_ready = False  # 排行榜是否已載入；載入前不在 event loop 上等待，登記成績的請求先保留
+        self.rankings_error = None  # 排行榜載入失敗的訊息，之後拒絕登記與查詢
+        self.parked_rankings = []  # 排行榜載入完成前收到、之後才處理的請求 (無參數的函式)
+        self.rankings_handle = None  # 檢查排行榜是否載入完成的 call_later handle
+        self.created_at = time.monotonic()  # 用來量測建立後到開始服務 (socket 已綁定) 的時間
+        self.ready_ms = None  # 建立到開始服務經過的毫秒數，start() 完成綁定時記錄
+        self.metrics = Metrics()  # 封包數、處理時間等統計，可用 [Stats] 查詢
+        self.metrics_file = metrics_file  # 若有設定，每 metrics_interval 秒寫出一次統計 JSON
+        self.metrics_interval = metrics_interval
+        self.metrics_handle = None
+        self.profile_interval = profile_interval  # 若有設定 (秒)，啟動取樣 profiler
+        self.record_file = record_file  # 若有設定，將收送的封包記錄到此檔 (session_log.py)，可用 replay.py 重播
+        self.recorder = None
+        self.record_handle = None
+        self.replay_answers = replay_answers  # 錄到的 client 位址 → 各局答案 (session_log.recorded_answers)，重播時依序出題
+        self.metrics.gauge("ready_ms", lambda: self.ready_ms)
+        self.metrics.gauge("sessions", lambda: len(self.sessions))
+        self.metrics.gauge("pending_sessions", lambda: len(self.pending_sessions))
+        self.metrics.gauge("idle_timers", lambda: len(self.idle_timers))
+        self.metrics.gauge("send_queue_bytes", lambda: self.transport.get_write_buffer_size() if self.transport else 0)
+        self.broadcaster = Broadcaster(self.send_raw, RANKING_CHUNK_BYTES)  # 觀戰者的訂閱與事件佇列 (broadcast.py)
+        self.broadcast_handle = None  # 合併送出廣播的 call_later handle
+        self.spectators = spectators  # 是否接受觀戰訂閱 (多 worker 模式下關閉)
+        self.metrics.gauge("subscribers", lambda: len(self.broadcaster))
+        self.metrics.gauge("broadcast_dropped", self.broadcaster.total_dropped)
+        self.rate_limiter = TokenBuckets(rate_limit) if rate_limit else None  # 每個來源位址的速率限制，0 或 None 為不限制
+        self.host_limiter = TokenBuckets(host_rate_limit) if host_rate_limit else None  # 每個來源 IP (所有 port 合計) 的速率限制
+        self.metrics.gauge("rate_buckets", lambda: sum(len(limiter) for limiter in self.limiters()))
+
+    # ===== observer 相關 =====
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def notify(self, event, *args):
+        # 呼叫每個 observer 的 on_<event>(*args)，沒有實作的 observer 直接略過
+        for observer in self.observers:
+            handler = getattr(observer, f"on_{event}", None)
+            if handler:
+                handler(*args)
+
+    def log(self, text, tag=None):
+        self.notify("log", text, tag)
+
+    # ===== socket 相關 =====
+    async def start(self, host, port, reuse_port=False, io_mode="asyncio"):
+        # 綁定 UDP socket 並開始接收封包；reuse_port 讓多個 worker 程序綁定同一個 port
+        # io_mode 為 "batch" 時改用 batch_io 一次讀取多個封包、整批送出回覆
+        self.loop = asyncio.get_running_loop()
+        if io_mode == "batch":
+            sock = bind_socket(host, port, reuse_port)
+            self.transport = BatchedDatagramEndpoint(self.loop, sock, self.handle_datagram)
+        else:
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: GameServerProtocol(self), local_addr=(host, port), reuse_port=reuse_port)
+        self.ready_ms = round(self.elapsed_ms(), 3)  # socket 已綁定，開始接收封包
+        self.tick_timers()
+        self.rankings.load_in_background()  # socket 已可服務，排行榜在背景載入
+        self.check_rankings_loaded()
+        if self.profile_interval:
+            self.metrics.start_profiler(self.profile_interval)
+        if self.metrics_file:
+            self.metrics_handle = self.loop.call_later(self.metrics_interval, self.dump_metrics)
+        if self.record_file:
+            self.recorder = EventRecorder(self.record_file)
+            self.record_handle = self.loop.call_later(RECORD_FLUSH_INTERVAL, self.flush_record)
+        self.log(f"[Info]: 伺服器已啟動，監聽 {host}:{port} (開始服務 {self.ready_ms:.1f} ms)\n", "info")
+
+    def elapsed_ms(self):
+        # 建立 GameServer 後經過的毫秒數
+        return (time.monotonic() - self.created_at) * 1000
+
+    def stop(self):
+        # 關閉所有 session 與 socket
+        for session in list(self.sessions.values()):
+            self.close_session(session.address)
+        if self.timer_handle:
+            self.timer_handle.cancel()
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.rankings_handle:
+            self.rankings_handle.cancel()
+            self.rankings_handle = None
+        if self.metrics_handle:
+            self.metrics_handle.cancel()
+            self.metrics_handle = None
+        self.metrics.stop_profiler()
+        if self.metrics_file:
+            self.metrics.dump(self.metrics_file)
+        if self.broadcast_handle:
+            self.broadcast_handle.cancel()
+            self.broadcast_handle = None
+        if self.record_handle:
+            self.record_handle.cancel()
+            self.record_handle = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.transport:
+            self.transport.close()
+        self.transport = None
+        self.rankings.close()
+
+    def sendto(self, msg, addr):
+        self.send_raw(msg.encode(), addr)
+
+    def send_raw(self, data, addr, answer=None):
+        # answer 只在送出 [Ready] 時提供，一併寫入封包紀錄
+        if self.transport:
+            self.transport.sendto(data, addr)
+            if self.recorder:
+                self.recorder.record("out", addr, data, answer)
+
+    def respond(self, session, seq, data, addr):
+        # 送出請求的回覆，並記住回覆內容供重複請求時重送
+        self.respond_many(session, seq, [data], addr)
+
+    def respond_many(self, session, seq, packets, addr):
+        # 同一個請求的回覆分成多個封包時使用
+        if session is not None and seq is not None:
+            session.last_seq = seq
+            session.last_response = packets
+        for data in packets:
+            self.send_raw(data, addr)
+
+    def is_duplicate(self, session, seq, addr):
+        # 已處理過的請求：同一個 seq 重送上次的回覆，更舊的直接丟棄
+        if session is None or seq is None or session.last_seq is None:
+            return False
+        if is_newer(seq, session.last_seq):
+            return False
+        self.metrics.count("duplicates")
+        if seq == session.last_seq and session.last_response:
+            for data in session.last_response:
+                self.send_raw(data, addr)
+        return True
+
+    # ===== session 相關 =====
+    def session_limited(self, addr):
+        # addr 還沒有 session 且 session 數已達上限時回傳 True (只計數，不回覆)
+        if addr in self.sessions or len(self.sessions) < self.max_sessions:
+            return False
+        self.metrics.count("dropped.session_limit")
+        return True
+
+    def open_session(self, addr):
+        # 建立(或重置) addr 的 session
+        session = self.sessions.get(addr)
+        if session is None:
+            session = GameSession(addr, next(self.session_ids))
+            self.sessions[addr] = session
+        session.answer = ""
+        session.answer_length = 0
+        session.scorer = None
+        self.reset_round(session)
+        self.reset_timeout_timer(session)
+        return session
+
+    @staticmethod
+    def reset_round(session):
+        # 清除本局的計時與猜測次數
+        session.guess_count = 0
+        session.ready_at = None
+        session.won_at = None
+        session.finish_time = None
+        session.recorded = False
+
+    def start_round(self, session):
+        # 開始新的一局：重播錄到的答案、固定答案或自動出題就直接開始，否則排入待設定答案佇列
+        if session.replay_answers:
+            self.apply_answer(session, session.replay_answers.popleft())
+        elif self.default_answer:
+            self.apply_answer(session, self.default_answer)
+        elif self.auto_length:
+            length = session.requested_length or self.auto_length
+            self.apply_answer(session, generate_answer(length, self.rng))
+        elif session not in self.pending_sessions:
+            self.pending_sessions.append(session)
+            self.notify("pending_changed", len(self.pending_sessions))
+        return session
+
+    def close_session(self, addr):
+        # 移除 addr 的 session 與其計時器
+        session = self.sessions.pop(addr, None)
+        if session is None:
+            return None
+        if session in self.pending_sessions:
+            self.pending_sessions.remove(session)
+            self.notify("pending_changed", len(self.pending_sessions))
+        self.idle_timers.discard(addr)
+        return session
+
+    def set_auto_length(self, length):
+        # 開啟 (length 為長度) 或關閉 (None) 自動出題；開啟時等待中的 session 也立即出題
+        self.auto_length = length
+        if not length:
+            return
+        while self.pending_sessions:
+            self.start_round(self.pending_sessions.popleft())
+        self.notify("pending_changed", 0)
+
+    def set_answer(self, answer, length):
+        # 操作者設定答案：套用到最早進入等待的 session
+        if not self.pending_sessions:
+            self.log("[Info]: 目前無等待設定答案之client，請再次確認是否已有連線\n", "info")
+            self.notify("pending_changed", 0)
+            return
+        error = validate_answer(answer, length)
+        if error:
+            self.log(f"[Error]: {error}\n", "error")
+            return
+        session = self.pending_sessions.popleft()
+        self.notify("pending_changed", len(self.pending_sessions))
+        self.apply_answer(session, answer)
+
+    def apply_answer(self, session, answer):
+        # 設定 session 的答案並通知 client 開始遊戲
+        length = len(answer)
+        session.answer = answer
+        session.answer_length = length
+        session.scorer = scorer_for(answer)  # 有計分表 (score_table.py) 時改為查表
+        self.reset_round(session)
+        self.reset_timeout_timer(session)
+        self.log(f"[Success]: ✅{session.address}的正確答案已設定為：{answer}\n", "success")
+        if session.binary:
+            ready = wire.pack_ready(session.session_id, length)
+        else:
+            ready = f"[Ready]: {length}，開始猜數字遊戲，請輸入{length}個數字/文字".encode()
+        self.send_raw(ready, session.address, answer)
+        session.ready_at = time.monotonic()  # 從送出 [Ready] 起開始計時
+
+    # ===== 封包處理 =====
+    def check_client_guess(self, session, guess: str):
+        # 驗證 client 猜測的結果
+        if session.won_at is not None:
+            return "[Error]: 本局已結束，請重新開始"
+        if len(guess) != session.answer_length:
+            return f"[Error]: 格式錯誤，請輸入{session.answer_length}位數字"
+        start = time.perf_counter()
+        try:
+            A, B = session.scorer.score(guess)
+        except ValueError:
+            return "[Error]: 請只輸入0-9或A-F的字元"
+        self.metrics.observe("scoring", time.perf_counter() - start)
+        self.count_guess(session, A)
+        self.publish_guess(session, guess, A, B)
+        if A == session.answer_length:
+            return f"恭喜猜對了!{A}A{B}B"
+        return f"{A}A{B}B"
+
+    @staticmethod
+    def count_guess(session, A):
+        # 記錄一次有效猜測；猜中時記下完成時間，排行榜只採用這裡記錄的成績
+        session.guess_count += 1
+        if A == session.answer_length:
+            session.won_at = time.monotonic()
+            session.finish_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def admit(self, data, addr):
+        # 在解碼、記錄與任何遊戲處理之前，丟棄格式不符或超過速率限制的封包 (只計數，不輸出訊息也不回覆)
+        if len(data) > MAX_REQUEST_BYTES or not (data.startswith(REQUEST_PREFIXES) or wire.is_binary(data)):
+            self.metrics.count("dropped.malformed")
+            return False
+        if self.rate_limiter is not None and not self.rate_limiter.allow(addr):
+            self.metrics.count("dropped.rate_limited")
+            return False
+        if self.host_limiter is not None and addr[0] not in LOCAL_HOSTS and not self.host_limiter.allow(addr[0]):
+            self.metrics.count("dropped.host_rate_limited")  # 本機 (壓力測試等) 只受每個位址的限制
+            return False
+        return True
+
+    def limiters(self):
+        return [limiter for limiter in (self.rate_limiter, self.host_limiter) if limiter is not None]
+
+    def handle_datagram(self, data, addr):
+        # 依來源 (ip, port) 將封包交給對應 session 處理
+        if not self.admit(data, addr):
+            return
+        start = time.perf_counter()
+        if self.recorder:
+            self.recorder.record("in", addr, data)
+        try:
+            if wire.is_binary(data):
+                self.handle_binary(data, addr)
+                return
+            msg = data.decode()
+            if self.observers:
+                self.log(f"[UDP]: 來自 {addr} 的訊息：{msg}\n")
+            session = self.sessions.get(addr)
+            if session:
+                self.reset_timeout_timer(session)
+
+            # 判斷各類封包種類做處理
+            if msg.startswith("[Connecting]:"):
+                self.metrics.count("packets.connecting")
+                if self.session_limited(addr):
+                    return
+                self.log(f"[Success]: 收到來自{addr}的連接訊息\n", "success")
+                session = self.open_session(addr)
+                options = wire.parse_options(msg)
+                session.binary = options.get("proto") == wire.CAPABILITY
+                session.requested_length = parse_length(options.get("len"))
+                if self.replay_answers is not None and "replay" in options:
+                    session.replay_answers = deque(self.replay_answers.get(options["replay"], ()))
+                session.last_seq = None  # 新連線的 client 序號從頭開始
+                session.last_response = None
+                token = self.broadcaster.token(addr)  # [Rankings] 查詢時帶回，證明來源位址收得到回覆
+                if session.binary:
+                    self.sendto(f"[Ack]: Server已啟動;proto={wire.CAPABILITY};sid={session.session_id};token={token}", addr)
+                else:
+                    self.sendto(f"[Ack]: Server已啟動;token={token}", addr)
+                self.start_round(session)
+            elif msg.startswith("[Guess]:"):
+                self.metrics.count("packets.guess")
+                msg, seq = wire.split_seq(msg)
+                if self.is_duplicate(session, seq, addr):
+                    return
+                guess = msg.split(":")[1].strip()
+                if session is None:
+                    server_reply = "[Error]: 尚未連線，請重新連線"
+                elif not session.answer:
+                    server_reply = "[Error]: 伺服器尚未設定好答案"
+                else:
+                    server_reply = self.check_client_guess(session, guess)
+                self.log(f"[Info]: 來自{addr}的猜測：{guess}→{server_reply}\n", "info")
+                self.respond(session, seq, wire.with_seq(f"[Guess Reply]: {server_reply}", seq).encode(), addr)
+            elif msg.startswith("[USERINFO]"):
+                self.metrics.count("packets.userinfo")
+                msg, seq = wire.split_seq(msg)
+                if self.is_duplicate(session, seq, addr):
+                    return
+                # 只採用名稱；舊版 client 附帶的次數與秒數一律忽略，成績以 server 記錄為準
+                _, arrow, info = msg.partition("->")
+                if not arrow:
+                    self.metrics.count("dropped.malformed")
+                    return
+                username = clean_name(info.split(",")[0])
+                if session is None or session.won_at is None or session.recorded:
+                    reply = "[Error]: 本局尚未猜中答案或成績已登記"
+                elif not username:
+                    reply = "[Error]: 請提供使用者名稱"
+                else:
+                    session.recorded = True
+                    self.record_win(session, seq, self.ranking_row(session, username), addr)
+                    return
+                self.respond(session, seq, wire.with_seq(reply, seq).encode(), addr)
+            elif msg.startswith("[Rankings]:"):
+                self.metrics.count("packets.rankings")
+                msg, seq = wire.split_seq(msg)
+                if self.is_duplicate(session, seq, addr):
+                    return
+                self.respond_many(session, seq, self.ranking_packets(session, msg, seq, addr), addr)
+            elif msg.startswith("[Subscribe]:"):
+                self.metrics.count("packets.subscribe")
+                msg, seq = wire.split_seq(msg)
+                self.sendto(wire.with_seq(self.subscribe(msg, addr), seq), addr)
+            elif msg.startswith("[Unsubscribe]"):
+                self.metrics.count("packets.unsubscribe")
+                msg, seq = wire.split_seq(msg)
+                if not self.broadcaster.check_token(addr, msg.partition("token=")[2].strip()):
+                    return  # 只接受訂閱者本人 (帶著 token) 取消
+                self.broadcaster.unsubscribe(addr)
+                self.sendto(wire.with_seq("[Unsubscribed]", seq), addr)
+            elif msg.startswith("[Stats]:"):
+                if addr[0] not in LOCAL_HOSTS:
+                    self.metrics.count("packets.stats_denied")  # 只回應本機的查詢
+                    return
+                self.metrics.count("packets.stats")
+                text = json.dumps(self.metrics.snapshot(), ensure_ascii=False, indent=1)
+                for packet in chunk_packets("Stats", text.splitlines(keepends=True), wire.split_seq(msg)[1]):
+                    self.send_raw(packet, addr)
+            elif msg.startswith("[Replay]:"):
+                self.metrics.count("packets.replay")
+                msg, seq = wire.split_seq(msg)
+                if self.is_duplicate(session, seq, addr) or self.session_limited(addr):
+                    return
+                self.log(f"[Info]: client端{addr}要求重新開始遊戲，請再次設定答案\n", "info")
+                session = self.open_session(addr)
+                if seq is not None:
+                    self.respond(session, seq, f"[Ack]: #{seq}".encode(), addr)
+                self.start_round(session)
+            elif msg.startswith("[Timeout]:"):
+                self.metrics.count("packets.timeout")
+                self.log(f"{msg}\n", "error")
+                self.close_session(addr)
+            elif msg == "QUIT":
+                self.metrics.count("packets.quit")
+                self.log(f"[Info]: client端{addr}已離開遊戲\n", "info")
+                self.close_session(addr)
+            else:
+                self.metrics.count("packets.unknown")
+        except Exception as e:
+            self.metrics.count("errors")
+            self.log(f"[Error]: {e}\n", "error")
+        finally:
+            self.metrics.observe("handle", time.perf_counter() - start)
+
+    def handle_binary(self, data, addr):
+        # 處理已協商二進位格式的封包；session id 不符的封包直接丟棄
+        opcode, session_id, body = wire.unpack(data)
+        self.metrics.count(f"packets.{BINARY_OPCODE_NAMES.get(opcode, 'bin.unknown')}")
+        session = self.sessions.get(addr)
+        if session is None or session.session_id != session_id:
+            self.metrics.count("packets.bin.stale")
+            return
+        try:
+            if opcode == wire.OP_GUESS:
+                seq, values = wire.unpack_guess(body)
+            elif opcode == wire.OP_REPLAY:
+                seq = wire.unpack_seq(body)
+        except struct.error:
+            self.metrics.count("dropped.malformed")  # 與其他格式錯誤的封包相同，只計數不輸出訊息
+            return
+        self.reset_timeout_timer(session)
+
+        if opcode == wire.OP_GUESS:
+            if self.is_duplicate(session, seq, addr):
+                return
+            if not session.scorer:
+                reply = wire.pack_error(session_id, seq, "[Error]: 伺服器尚未設定好答案")
+                result = "尚未設定答案"
+            elif session.won_at is not None:
+                reply = wire.pack_error(session_id, seq, "[Error]: 本局已結束，請重新開始")
+                result = "本局已結束"
+            elif len(values) != session.answer_length:
+                reply = wire.pack_error(session_id, seq, f"[Error]: 格式錯誤，請輸入{session.answer_length}位數字")
+                result = "格式錯誤"
+            else:
+                scoring_start = time.perf_counter()
+                A, B = session.scorer.score_values(values)
+                self.metrics.observe("scoring", time.perf_counter() - scoring_start)
+                self.count_guess(session, A)
+                self.publish_guess(session, values, A, B)
+                reply = wire.pack_reply(session_id, seq, A, B)
+                result = f"{A}A{B}B"
+            if self.observers:
+                guess = "".join(HEX_DIGITS[v] for v in values)
+                self.log(f"[Info]: 來自{addr}的猜測：{guess}→{result}\n", "info")
+            self.respond(session, seq, reply, addr)
+        elif opcode == wire.OP_REPLAY:
+            if self.is_duplicate(session, seq, addr):
+                return
+            self.log(f"[Info]: client端{addr}要求重新開始遊戲，請再次設定答案\n", "info")
+            self.open_session(addr)
+            self.respond(session, seq, wire.pack_seq(wire.OP_ACK, session_id, seq), addr)
+            self.start_round(session)
+        elif opcode == wire.OP_TIMEOUT:
+            self.log(f"[Timeout]: client端{addr}已閒置過久，自動中止遊戲\n", "error")
+            self.close_session(addr)
+        elif opcode == wire.OP_QUIT:
+            self.log(f"[Info]: client端{addr}已離開遊戲\n", "info")
+            self.close_session(addr)
+
+    # ===== timeout 相關 =====
+    def reset_timeout_timer(self, session):
+        # 重置該 session 的閒置計時 (只更新期限，不建立計時器)
+        self.idle_timers.touch(session.address)
+
+    def tick_timers(self):
+        # 每個 tick 推進一次 timer wheel，到期的 session 由 handle_timeout 處理
+        self.idle_timers.advance()
+        for limiter in self.limiters():
+            limiter.prune()  # 已補滿的 bucket 不需要保留
+        self.broadcaster.prune()  # 過期的訂閱
+        self.timer_handle = self.loop.call_later(self.idle_timers.tick, self.tick_timers)
+
+    def handle_timeout(self, addr):
+        # timeout 處理邏輯：只結束閒置的 session，其他玩家不受影響
+        session = self.close_session(addr)
+        if session is None:
+            return
+        self.metrics.count("timeouts")
+        self.log(f"[Timeout]: {addr} {self.TIMEOUT_DURATION}秒內沒有互動，遊戲已自動結束!\n", "error")
+        try:
+            if session.binary:
+                self.send_raw(wire.pack(wire.OP_TIMEOUT, session.session_id), addr)
+            else:
+                self.sendto(f"[Timeout]: Server已閒置過久，自動中止遊戲", addr)
+        except Exception as e:
+            self.log(f"[Error]: 傳送timeout通知失敗: {e}\n", "error")
+
+    # ===== 排行榜相關 =====
+    def check_rankings_loaded(self):
+        # 排行榜載入期間定期檢查 (不阻塞 event loop)，載入結束後處理保留的請求
+        loaded, error = self.rankings.load_status()
+        if not loaded:
+            self.rankings_handle = self.loop.call_later(RANKING_LOAD_POLL, self.check_rankings_loaded)
+            return
+        self.rankings_handle = None
+        if error is None:
+            self.rankings_ready = True
+            self.log(f"[Info]: 排行榜載入完成 ({self.elapsed_ms():.1f} ms)\n", "info")
+        else:
+            self.rankings_error = error
+            self.log(f"[Error]: 排行榜載入失敗，停止登記與查詢排行榜：{error}\n", "error")
+        parked, self.parked_rankings = self.parked_rankings, []
+        for request in parked:
+            request()
+
+    def rankings_unavailable(self):
+        # 排行榜無法使用時回傳錯誤回覆，可以使用時回傳 None
+        if self.rankings_error is not None:
+            return "[Error]: 排行榜載入失敗，暫時無法使用"
+        if not self.rankings_ready:
+            return "[Error]: 排行榜載入中，請稍後再試"
+        return None
+
+    @staticmethod
+    def ranking_row(session, username):
+        # 以 server 記錄的本局成績建立排行榜紀錄
+        return {
+            "name": username,
+            "length": session.answer_length,
+            "guesses": session.guess_count,
+            "time": round(session.won_at - session.ready_at, 3),
+            "finish_time": session.finish_time
+        }
+
+    def record_win(self, session, seq, row, addr):
+        # 登記成績並回覆名次；排行榜還在載入時先保留請求 (重送的同一個請求視為重複)，載入結束後再處理
+        if not self.rankings_ready and self.rankings_error is None:
+            if seq is not None:
+                session.last_seq = seq
+                session.last_response = None
+            self.parked_rankings.append(lambda: self.record_win(session, seq, row, addr))
+            return
+        rank = None
+        if self.rankings_error is not None:
+            session.recorded = False
+            reply = "[Error]: 排行榜載入失敗，成績無法登記"
+        else:
+            rank = self.add_user_rankings(session, row)
+            reply = f"[Congratulations!]: {row['name']}！你是第 {rank}名! (共猜{row['guesses']}次，用時{row['time']:.2f}秒)\n"
+        self.respond(session, seq, wire.with_seq(reply, seq).encode(), addr)
+        if rank is not None:
+            self.show_rankings(row["length"], highlight_rank=rank)
+
+    def add_user_rankings(self, session, row):
+        # 將本局成績加入排行榜，回傳名次
+        self.schedule_flush()
+        start = time.perf_counter()
+        rank = self.rankings.insert(row)
+        self.metrics.observe("ranking_insert", time.perf_counter() - start)
+        self.publish_ranking(session, row, rank)
+        return rank
+
+    def schedule_flush(self):
+        # GROUP_COMMIT_DELAY 秒後提交排行榜，期間完成的紀錄會合併在同一次提交
+        if self.flush_handle is None and self.loop is not None:
+            self.flush_handle = self.loop.call_later(GROUP_COMMIT_DELAY, self.flush_rankings)
+
+    def flush_rankings(self):
+        self.flush_handle = None
+        start = time.perf_counter()
+        self.rankings.flush()
+        self.metrics.observe("ranking_flush", time.perf_counter() - start)
+
+    def dump_metrics(self):
+        # 定期寫出統計 JSON
+        try:
+            self.metrics.dump(self.metrics_file)
+        except OSError as e:
+            self.log(f"[Error]: 寫出 metrics 失敗：{e}\n", "error")
+        self.metrics_handle = self.loop.call_later(self.metrics_interval, self.dump_metrics)
+
+    def flush_record(self):
+        # 定期將緩衝的封包事件寫入紀錄檔
+        try:
+            self.recorder.flush()
+        except OSError as e:
+            self.log(f"[Error]: 寫入封包紀錄失敗：{e}\n", "error")
+        self.record_handle = self.loop.call_later(RECORD_FLUSH_INTERVAL, self.flush_record)
+
+    def ranking_packets(self, session, msg, seq, addr):
+        """處理 [Rankings] 查詢，回傳切成 datagram 大小的回覆封包
+
+        格式為 "[Rankings]: <kind>;key=value...;token=<token>"，kind 為 top (k、offset 或 page)、
+        user (name) 或 around (name、k)，例如 "[Rankings]: top;k=10;page=2;len=4;token=..."。
+        len 為答案長度，未指定時使用 session 目前的答案長度。
+        token 為 [Ack] 中配發的 token；沒有帶正確 token 時只回覆一個帶 token 的短封包，
+        偽造來源位址的小請求無法換到多個封包的排行榜 (與 [Subscribe] 相同)。
+        """
+        error = self.rankings_unavailable()
+        if error:
+            return [wire.with_seq(error, seq).encode()]
+        body = msg.split(":", 1)[1]
+        kind = body.split(";")[0].strip() or "top"
+        options = wire.parse_options(body)
+        if not self.broadcaster.check_token(addr, options.get("token")):
+            self.metrics.count("rankings.challenged")
+            return [wire.with_seq(f"[Rankings]: token={self.broadcaster.token(addr)}", seq).encode()]
+        try:
+            k = min(MAX_RANKING_QUERY, max(1, int(options.get("k", RANKING_PAGE_SIZE))))
+            offset = max(0, int(options.get("offset", 0)))
+            if "page" in options:
+                offset = (max(1, int(options["page"])) - 1) * k
+            if "len" in options:
+                length = int(options["len"])
+            else:
+                length = session.answer_length if session and session.answer_length else DEFAULT_RANKING_LENGTH
+            rows = self.rankings.query(kind, options.get("name"), k, offset, length)
+        except ValueError:
+            return [wire.with_seq("[Error]: 排行榜查詢格式錯誤", seq).encode()]
+        lines = [format_ranking(rank, rec) for rank, rec in rows] or ["(無資料)\n"]
+        return chunk_packets("Rankings", lines, seq, f" len={length}")
+
+    def show_rankings(self, length, highlight_rank=None):
+        # 顯示該答案長度排行榜的前幾名，並標示本次紀錄 (名次在前幾名之外時另外列出)
+        if not self.observers:
+            return
+        rows = self.rankings.query("top", k=RANKING_PAGE_SIZE, length=length)
+        self.log(f"[Ranking]: 長度 {length}\n", "bold")
+        for rank, rec in rows:
+            self.log(format_ranking(rank, rec), "bold" if rank == highlight_rank else None)
+        if highlight_rank and highlight_rank > RANKING_PAGE_SIZE:
+            (rank, rec), = self.rankings.query("top", k=1, offset=highlight_rank - 1, length=length)
+            self.log("...\n")
+            self.log(format_ranking(rank, rec), "bold")
+
+    # ===== 觀戰廣播相關 =====
+    def subscribe(self, msg, addr):
+        """處理 "[Subscribe]: <主題>;token=<token>"，回傳回覆內容
+
+        沒有帶正確 token 時只回覆 token，不開始廣播；來源位址收得到回覆、帶著 token
+        再送一次才訂閱 (偽造來源位址的請求無法讓伺服器向第三者廣播)。
+        """
+        if not self.spectators:
+            return "[Error]: 多 worker 模式不支援觀戰，請連線單一程序的伺服器"
+        body = msg.split(":", 1)[1]
+        topics = parse_topics(body.split(";")[0])
+        if topics is None:
+            return "[Error]: 訂閱主題應為 guesses 或 rankings"
+        token = self.broadcaster.token(addr)
+        if not self.broadcaster.check_token(addr, wire.parse_options(body).get("token")):
+            self.metrics.count("subscribe.challenged")
+            return f"[Subscribed]: {','.join(topics)};token={token}"
+        if self.broadcaster.subscribe(addr, topics) is None:
+            self.metrics.count("subscribe.rejected")
+            return "[Error]: 觀戰人數已達上限，請稍後再試"
+        return f"[Subscribed]: {','.join(topics)};token={token};lease={self.broadcaster.lease:g}"
+
+    def publish_guess(self, session, guess, A, B):
+        # 將猜測結果放進訂閱 guesses 的觀戰者佇列；guess 為猜測字串或二進位封包的數字 list
+        if not self.broadcaster.wants("guesses"):
+            return
+        if not isinstance(guess, str):
+            guess = "".join(HEX_DIGITS[v] for v in guess)
+        self.broadcaster.publish("guesses", [f"guess sid={session.session_id} len={session.answer_length} {guess} {A}A{B}B\n"])
+        self.schedule_broadcast()
+
+    def publish_ranking(self, session, row, rank):
+        # 登上排行榜的玩家，以及該長度最新的前幾名 (同一長度只保留最新的一份)
+        if not self.broadcaster.wants("rankings"):
+            return
+        length = row["length"]
+        self.broadcaster.publish("rankings", [f"win sid={session.session_id} len={length} {row['name']} 第{rank}名\n"])
+        top = self.rankings.query("top", k=RANKING_PAGE_SIZE, length=length)
+        self.broadcaster.publish("rankings", [f"top len={length}\n"] + [format_ranking(r, rec) for r, rec in top],
+                                 key=("top", length))
+        self.schedule_broadcast()
+
+    def schedule_broadcast(self):
+        # BROADCAST_INTERVAL 秒後合併送出，期間的事件放進同一批封包
+        if self.broadcast_handle is None and self.loop is not None:
+            self.broadcast_handle = self.loop.call_later(BROADCAST_INTERVAL, self.flush_broadcast)
+
+    def flush_broadcast(self):
+        self.broadcast_handle = None
+        if self.transport is None:
+            return
+        if self.transport.get_write_buffer_size() > BACKLOG_LIMIT:
+            self.metrics.count("broadcast.deferred")  # 遊戲回覆優先，事件留在佇列 (滿了就丟棄舊的)
+        else:
+            start = time.perf_counter()
+            self.metrics.count("broadcast.packets", self.broadcaster.flush())
+            self.metrics.observe("broadcast_flush", time.perf_counter() - start)
+        if self.broadcaster.pending():
+            self.schedule_broadcast()
+
+class GameServerProtocol(asyncio.DatagramProtocol):
+    """將 asyncio 收到的 datagram 轉交給 GameServer"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.server.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server.handle_datagram(data, addr)
+
+    def error_received(self, exc):
+        self.server.log(f"[Error]: {exc}\n", "error")
+
+class ConsoleObserver:
+    """headless 模式下將遊戲事件輸出到 stdout"""
+
+    def on_log(self, text, tag=None):
+        print(text, end="", flush=True)
+
+async def serve(server, host, port, reuse_port=False, io_mode="asyncio"):
+    # 啟動伺服器並持續執行直到被中斷
+    await server.start(host, port, reuse_port, io_mode)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP猜字串 headless server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--answer", help="所有 session 使用的固定答案 (0-9A-F，不重複)")
+    parser.add_argument("--auto-length", type=int, help=f"自動出題的預設答案長度 ({MIN_LENGTH}~{MAX_LENGTH}，預設 {DEFAULT_AUTO_LENGTH})，client 可用 len= 另外指定")
+    parser.add_argument("--quiet", action="store_true", help="不輸出遊戲事件")
+    parser.add_argument("--workers", type=int, default=0, help="以 SO_REUSEPORT 啟動多個 worker 程序 (0 為單一程序)")
+    parser.add_argument("--io", choices=("asyncio", "batch"), default="asyncio", help="收送封包的方式 (batch 為批次收送)")
+    parser.add_argument("--rankings", choices=sorted(BACKENDS), default="sqlite", help="排行榜的儲存後端")
+    parser.add_argument("--metrics-file", help="定期將統計寫入此 JSON 檔 (多 worker 時加上 .<worker 編號>)")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL, help="寫出統計的間隔 (秒)")
+    parser.add_argument("--rate-limit", type=float, default=DEFAULT_RATE, help="每個來源位址每秒允許的封包數 (0 為不限制)")
+    parser.add_argument("--host-rate-limit", type=float, default=DEFAULT_HOST_RATE, help="每個來源 IP 所有 port 合計每秒允許的封包數 (0 為不限制，本機不受限制)")
+    parser.add_argument("--record", metavar="PATH", help="將收送的封包記錄到此 JSON-lines 檔，可用 replay.py 重播 (多 worker 時加上 .<worker 編號>)")
+    parser.add_argument("--replay-answers", metavar="PATH", help="以 --record 紀錄檔中的答案出題：replay.py 重播的每個 client 依序使用當初各局的答案")
+    parser.add_argument("--profile", type=float, metavar="MS", help="啟動取樣 profiler，每 MS 毫秒取樣一次")
+    parser.add_argument("--gui", action="store_true", help="開啟伺服器視窗 (server_GUI)，其他參數不適用")
+    args = parser.parse_args()
+
+    if args.gui:
+        import server_GUI  # 只有需要視窗時才載入 Tkinter
+        server_GUI.main()
+        return
+
+    answer = args.answer.upper() if args.answer else None
+    if answer and validate_answer(answer, len(answer)):
+        parser.error(validate_answer(answer, len(answer)))
+    if args.auto_length is not None and parse_length(args.auto_length) is None:
+        parser.error(f"--auto-length 應介於 {MIN_LENGTH}~{MAX_LENGTH}")
+    if args.auto_length is None and not answer:
+        args.auto_length = DEFAULT_AUTO_LENGTH  # 手動設定答案只有 GUI 模式可用
+    server_options = {
+        "default_answer": answer,
+        "auto_length": args.auto_length,
+        "metrics_file": args.metrics_file,
+        "metrics_interval": args.metrics_interval,
+        "profile_interval": args.profile / 1000 if args.profile else None,
+        "record_file": args.record,
+        "rate_limit": args.rate_limit,
+        "host_rate_limit": args.host_rate_limit,
+        "replay_answers": recorded_answers(read_records(args.replay_answers)) if args.replay_answers else None,
+    }
+
+    if args.workers > 0:
+        import worker_pool
+        worker_pool.run_workers(args.workers, args.host, args.port, server_options, quiet=args.quiet,
+                                io_mode=args.io, backend=args.rankings)
+        return
+
+    server = GameServer(rankings=RankingStore(BACKENDS[args.rankings]()), **server_options)
+    if not args.quiet:
+        server.add_observer(ConsoleObserver())
+    try:
+        asyncio.run(serve(server, args.host, args.port, io_mode=args.io))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""執行緒安全、批次更新的訊息輸出區
+
+任何執行緒都可以呼叫 write()/post()，訊息只會放進佇列；Tk 主迴圈每隔
+interval_ms 以 after() 取出一批，合併成一次 insert 與一次 see()，並限制
+保留的行數。收封包的執行緒因此不會卡在 widget 重繪上。
+"""
+
+import queue
+import tkinter as tk
+from functools import partial
+
+class LogPane:
+    def __init__(self, root, text_widget, max_lines=2000, interval_ms=50, batch_limit=1000):
+        self.root = root
+        self.text = text_widget
+        self.max_lines = max_lines  # 最多保留的行數
+        self.interval_ms = interval_ms  # 每次更新的間隔
+        self.batch_limit = batch_limit  # 每次更新最多處理的項目數，剩下的留到下一輪
+        self.queue = queue.SimpleQueue()
+        self.root.after(self.interval_ms, self.drain)
+
+    def write(self, text, tag=None):
+        # 加入一段要顯示的文字 (可從任何執行緒呼叫)
+        self.queue.put((text, tag or ""))
+
+    def post(self, func, *args, **kwargs):
+        # 將其他 widget 操作交給 Tk 主迴圈執行 (可從任何執行緒呼叫)
+        self.queue.put((partial(func, *args, **kwargs), None))
+
+    def drain(self):
+        # 由 Tk 主迴圈定期呼叫：批次寫入文字並執行排隊中的 widget 操作
+        chunks = []
+        try:
+            for _ in range(self.batch_limit):
+                item, tag = self.queue.get_nowait()
+                if tag is None:
+                    item()
+                else:
+                    chunks.extend((item, tag))
+        except queue.Empty:
+            pass
+
+        if chunks:
+            self.text.config(state="normal")
+            self.text.insert(tk.END, *chunks)
+            excess = int(self.text.index("end-1c").split(".")[0]) - self.max_lines
+            if excess > 0:
+                self.text.delete("1.0", f"{excess + 1}.0")
+            self.text.config(state="disabled")
+            self.text.see(tk.END)
+        self.root.after(self.interval_ms, self.drain)
@@ -0,0 +1,313 @@
+"""UDP猜字串 壓力測試工具
+
+以 asyncio 模擬大量玩家，每個玩家使用自己的 ephemeral port 跑完整流程：
+[Connecting] → [Ready] → [Guess]... → [USERINFO]，並輸出 JSON 格式的結果
+(吞吐量、猜測回覆延遲 p50/p99、封包遺失率、排行榜寫入的往返時間)。
+
+伺服器需能自動出題，例如：
+    python game_server.py --quiet --answer 0123
+    python load_test.py --players 2000 --concurrency 200 --answer 0123
+或使用隨機答案，搭配 --bot solver 讓模擬玩家以解題器猜中：
+    python game_server.py --quiet --auto-length 4
+    python load_test.py --players 500 --bot solver
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import wire
+from scoring import HEX_DIGITS, DIGIT_VALUE
+from solver import Solver
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def summarize(samples):
+    # 將延遲 (秒) 整理為毫秒的 p50/p99/max
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3) if samples else None,
+        "p99_ms": round(percentile(samples, 99) * 1000, 3) if samples else None,
+        "max_ms": round(max(samples) * 1000, 3) if samples else None,
+    }
+
+class Stats:
+    def __init__(self):
+        self.sent = 0  # 送出的請求封包數 (含重送)
+        self.lost = 0  # 逾時沒有收到回覆的次數
+        self.connect_latency = []
+        self.guess_latency = []
+        self.userinfo_latency = []
+        self.games_won = 0
+        self.games_failed = 0
+
+class PlayerProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.queue.put_nowait(data)
+
+def random_strategy(length, history):
+    # 預設策略：隨機猜不重複的字元
+    return "".join(random.sample(HEX_DIGITS, length))
+
+def solver_strategy(length, history):
+    """以 solver.Solver 挑選下一個猜測
+
+    在 process pool 中執行，不佔用產生負載的 event loop (否則解題期間所有模擬玩家
+    都收不到回覆，量到的延遲會包含解題時間)；每次依 history 重建 Solver，不保留狀態。
+    """
+    solver = Solver(length)
+    for guess, A, B in history:
+        solver.update(guess, A, B)
+    try:
+        return solver.next_guess()
+    except (ValueError, TimeoutError):
+        return random_strategy(length, history)
+
+STRATEGIES = {  # 名稱 → (策略, 是否在 process pool 中執行)
+    "random": (random_strategy, False),
+    "solver": (solver_strategy, True),
+}
+
+class SimulatedPlayer:
+    def __init__(self, index, server_address, options, stats, strategy=random_strategy, executor=None):
+        self.index = index
+        self.server_address = server_address
+        self.options = options
+        self.stats = stats
+        self.strategy = strategy  # strategy(length, history) 回傳下一個猜測
+        self.executor = executor  # 若有設定，strategy 在此 executor 中執行
+        self.transport = None
+        self.protocol = None
+        self.stash = []  # 等待時收到但不符合的封包，留給之後的等待
+        self.binary = False
+        self.session_id = 0
+        self.seq = 0
+
+    async def wait_for(self, match, timeout):
+        # 等待符合 match 的封包，逾時回傳 None
+        for i, data in enumerate(self.stash):
+            if match(data):
+                return self.stash.pop(i)
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            try:
+                data = await asyncio.wait_for(self.protocol.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if match(data):
+                return data
+            self.stash.append(data)
+
+    async def request(self, payload, match, latencies):
+        # 送出請求並等待回覆，逾時就重送 (最多 retries 次)
+        for _ in range(self.options.retries + 1):
+            self.stats.sent += 1
+            start = time.perf_counter()
+            self.transport.sendto(payload)
+            data = await self.wait_for(match, self.options.reply_timeout)
+            if data is not None:
+                latencies.append(time.perf_counter() - start)
+                return data
+            self.stats.lost += 1
+        return None
+
+    def next_seq(self):
+        self.seq = self.seq % 0xFFFF + 1
+        return self.seq
+
+    def seq_matcher(self, seq):
+        def match(data):
+            if wire.is_binary(data):
+                opcode, _, body = wire.unpack(data)
+                return opcode in (wire.OP_REPLY, wire.OP_ERROR, wire.OP_ACK) and wire.unpack_seq(body) == seq
+            return wire.split_seq(data.decode(errors="replace"))[1] == seq
+        return match
+
+    @staticmethod
+    def is_ready(data):
+        if wire.is_binary(data):
+            return wire.unpack(data)[0] == wire.OP_READY
+        return data.startswith("[Ready]:".encode())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            PlayerProtocol, remote_addr=self.server_address)
+        try:
+            await self.play()
+        finally:
+            self.transport.close()
+
+    async def play(self):
+        options = self.options
+        proto = f";proto={wire.CAPABILITY}" if options.binary else ""
+        if options.length:
+            proto += f";len={options.length}"
+        ack = await self.request(f"[Connecting]: loadtest-{self.index}{proto}".encode(),
+                                 lambda data: data.startswith(b"[Ack]:"), self.stats.connect_latency)
+        if ack is None:
+            self.stats.games_failed += 1
+            return
+        ack_options = wire.parse_options(ack.decode())
+        self.binary = ack_options.get("proto") == wire.CAPABILITY
+        self.session_id = int(ack_options.get("sid", 0))
+
+        for round_index in range(options.rounds):
+            if round_index:
+                seq = self.next_seq()
+                payload = (wire.pack_seq(wire.OP_REPLAY, self.session_id, seq) if self.binary
+                           else f"[Replay]:loadtest #{seq}".encode())
+                if await self.request(payload, self.seq_matcher(seq), []) is None:
+                    self.stats.games_failed += 1
+                    return
+            ready = await self.wait_for(self.is_ready, options.ready_timeout)
+            if ready is None:
+                self.stats.games_failed += 1
+                return
+            if not await self.play_round(self.ready_length(ready)):
+                self.stats.games_failed += 1
+                return
+        await self.send_quit()
+
+    def ready_length(self, data):
+        if wire.is_binary(data):
+            return wire.READY_BODY.unpack(wire.unpack(data)[2])[0]
+        return int(data.decode().split(":")[1].split("，")[0])
+
+    async def play_round(self, length):
+        # 猜到答案或用完次數為止；猜中時回報 [USERINFO]
+        options = self.options
+        history = []
+        for guess_index in range(options.max_guesses):
+            if options.answer and guess_index == options.max_guesses - 1:
+                guess = options.answer  # 最後一次直接猜已知答案，確保能完成整個流程
+            else:
+                guess = await self.choose_guess(length, history)
+            seq = self.next_seq()
+            if self.binary:
+                payload = wire.pack_guess(self.session_id, seq, [DIGIT_VALUE[c] for c in guess])
+            else:
+                payload = f"[Guess]: {guess} #{seq}".encode()
+            reply = await self.request(payload, self.seq_matcher(seq), self.stats.guess_latency)
+            if reply is None:
+                return False
+            A, B = self.parse_reply(reply)
+            history.append((guess, A, B))
+            if A == length:
+                self.stats.games_won += 1
+                await self.report()
+                return True
+        return True
+
+    async def choose_guess(self, length, history):
+        if self.executor is None:
+            return self.strategy(length, history)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.strategy, length, history)
+
+    def parse_reply(self, data):
+        if wire.is_binary(data):
+            opcode, _, body = wire.unpack(data)
+            if opcode != wire.OP_REPLY:
+                return 0, 0
+            _, A, B = wire.REPLY_BODY.unpack(body)
+            return A, B
+        return wire.parse_score(wire.split_seq(data.decode())[0]) or (0, 0)
+
+    async def report(self):
+        # 成績由伺服器記錄，只需回報名稱
+        seq = self.next_seq()
+        msg = f"[USERINFO]->loadtest-{self.index}"
+        await self.request(wire.with_seq(msg, seq).encode(), self.seq_matcher(seq), self.stats.userinfo_latency)
+
+    async def send_quit(self):
+        if self.binary:
+            self.transport.sendto(wire.pack(wire.OP_QUIT, self.session_id))
+        else:
+            self.transport.sendto(b"QUIT")
+
+async def run_load(options):
+    strategy, offload = STRATEGIES[options.bot]
+    executor = ProcessPoolExecutor(options.solver_processes) if offload else None
+    stats = Stats()
+    server_address = (options.host, options.port)
+    semaphore = asyncio.Semaphore(options.concurrency)
+
+    async def run_player(index):
+        async with semaphore:
+            await SimulatedPlayer(index, server_address, options, stats, strategy, executor).run()
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_player(i) for i in range(options.players)))
+        elapsed = time.perf_counter() - start
+    finally:
+        if executor:
+            executor.shutdown()
+
+    guesses = len(stats.guess_latency)
+    return {
+        "players": options.players,
+        "concurrency": options.concurrency,
+        "binary": options.binary,
+        "bot": options.bot,
+        "elapsed_s": round(elapsed, 3),
+        "games_won": stats.games_won,
+        "games_failed": stats.games_failed,
+        "guesses": guesses,
+        "guesses_per_s": round(guesses / elapsed, 1) if elapsed else None,
+        "requests_sent": stats.sent,
+        "requests_lost": stats.lost,
+        "loss_rate": round(stats.lost / stats.sent, 6) if stats.sent else None,
+        "connect_latency": summarize(stats.connect_latency),
+        "guess_latency": summarize(stats.guess_latency),
+        "userinfo_latency": summarize(stats.userinfo_latency),
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="UDP猜字串 壓力測試工具")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=1000, help="模擬玩家總數")
+    parser.add_argument("--concurrency", type=int, default=200, help="同時進行的玩家數")
+    parser.add_argument("--rounds", type=int, default=1, help="每個玩家玩幾局 (第二局起送 [Replay])")
+    parser.add_argument("--max-guesses", type=int, default=10, help="每局最多猜幾次")
+    parser.add_argument("--answer", help="伺服器的固定答案；提供時最後一次猜測直接猜答案")
+    parser.add_argument("--binary", action="store_true", help="協商使用二進位封包")
+    parser.add_argument("--bot", choices=sorted(STRATEGIES), default="random",
+                        help="猜測策略：random 隨機猜，solver 使用 solver.py 解題 (在另外的程序中計算)")
+    parser.add_argument("--solver-processes", type=int, default=os.cpu_count(), help="--bot solver 解題用的程序數")
+    parser.add_argument("--length", type=int, help="要求伺服器自動出題的答案長度 (伺服器需啟用 --auto-length)")
+    parser.add_argument("--reply-timeout", type=float, default=1.0, help="等待回覆的秒數，逾時算遺失並重送")
+    parser.add_argument("--ready-timeout", type=float, default=5.0, help="等待 [Ready] 的秒數")
+    parser.add_argument("--retries", type=int, default=3, help="每個請求最多重送次數")
+    parser.add_argument("--output", help="將結果 JSON 寫入檔案 (預設輸出到 stdout)")
+    return parser
+
+def main():
+    options = build_parser().parse_args()
+    if options.answer:
+        options.answer = options.answer.upper()
+    result = asyncio.run(run_load(options))
+    text = json.dumps(result, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""伺服器的計數器、延遲直方圖與取樣 profiler
+
+Metrics 只在 event loop 的執行緒上更新，因此不加鎖；每次記錄只是一次 dict
+查詢與整數加法。延遲以 2 的次方 (微秒) 為邊界的直方圖保存，不保留原始樣本，
+p50/p99 為所在 bucket 的上界 (不超過實際的最大值)。
+
+SamplingProfiler 為選用功能：背景執行緒每隔 interval 秒讀取目標執行緒目前的
+stack，統計最常出現的位置 (self：最內層的函式；inclusive：stack 上出現過的函式)。
+
+也可以直接執行本模組向本機的伺服器查詢 [Stats]：
+    python metrics.py --port 5000
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+BUCKETS = 32  # 第 i 個 bucket 記錄小於 2**i 微秒的樣本
+PROFILE_DEPTH = 32  # 取樣時最多往上看幾層 stack
+PROFILE_TOP = 15  # 快照中列出的位置數
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+
+    def percentile(self, p):
+        # 回傳第 p 百分位所在 bucket 的上界 (秒)，不超過實際觀察到的最大值
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4),
+            "p50_ms": round(self.percentile(50) * 1000, 4),
+            "p99_ms": round(self.percentile(99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+class SamplingProfiler:
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id  # 要取樣的執行緒 (event loop 的執行緒)
+        self.interval = interval
+        self.self_samples = Counter()
+        self.inclusive_samples = Counter()
+        self.total = 0
+        self.running = False
+        self.lock = threading.Lock()  # 取樣執行緒與快照 (event loop 執行緒) 共用計數
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, name="sampling-profiler", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.record(frame)
+            time.sleep(self.interval)
+
+    def record(self, frame):
+        innermost = self.where(frame, line=True)
+        seen = set()
+        for _ in range(PROFILE_DEPTH):
+            if frame is None:
+                break
+            seen.add(self.where(frame))
+            frame = frame.f_back
+        with self.lock:
+            self.total += 1
+            self.self_samples[innermost] += 1
+            self.inclusive_samples.update(seen)
+
+    @staticmethod
+    def where(frame, line=False):
+        code = frame.f_code
+        text = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return f"{text}:{frame.f_lineno}" if line else text
+
+    def snapshot(self):
+        def top(samples):
+            return [{"where": where, "samples": n, "share": round(n / self.total, 4)}
+                    for where, n in samples.most_common(PROFILE_TOP)]
+        with self.lock:
+            return {"samples": self.total, "interval_ms": self.interval * 1000,
+                    "self": top(self.self_samples), "inclusive": top(self.inclusive_samples)}
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.counters = Counter()
+        self.histograms = defaultdict(Histogram)
+        self.gauges = {}  # 名稱 → 回傳目前數值的函式，快照時才計算
+        self.profiler = None
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def observe(self, name, seconds):
+        self.histograms[name].observe(seconds)
+
+    def gauge(self, name, func):
+        self.gauges[name] = func
+
+    def start_profiler(self, interval, thread_id=None):
+        # 開始取樣 thread_id (預設為目前的執行緒)
+        self.profiler = SamplingProfiler(thread_id or threading.get_ident(), interval)
+        self.profiler.start()
+
+    def stop_profiler(self):
+        if self.profiler:
+            self.profiler.stop()
+
+    def snapshot(self):
+        snapshot = {
+            "pid": os.getpid(),
+            "uptime_s": round(time.monotonic() - self.started_at, 3),
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": {name: func() for name, func in sorted(self.gauges.items())},
+            "histograms": {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+        }
+        if self.profiler:
+            snapshot["profile"] = self.profiler.snapshot()
+        return snapshot
+
+    def dump(self, path):
+        # 寫入暫存檔後再取代，讀取端不會讀到寫一半的檔案
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+def query_stats(host, port, timeout=2.0):
+    # 送出 [Stats] 並組合分段的回覆，回傳解析後的 dict
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        sock.sendto(b"[Stats]: #1", (host, port))
+        parts = {}
+        while True:
+            text = sock.recv(4096).decode()
+            header, _, body = text.partition("\n")
+            index, _, total = header.split(":", 1)[1].strip().partition("/")
+            parts[int(index)] = body.rsplit(" #", 1)[0]  # 每段結尾都帶有序號
+            if len(parts) == int(total):
+                return json.loads("\n".join(parts[i] for i in sorted(parts)))
+    finally:
+        sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="查詢本機 UDP猜字串 伺服器的 [Stats]")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(query_stats(args.host, args.port), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
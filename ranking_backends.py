@@ -0,0 +1,187 @@
+"""排行榜的儲存後端
+
+RankingStore 只負責記憶體中的排序與查詢，紀錄的持久化交給後端。每個後端提供：
+    load()        回傳所有紀錄 (list of dict)，第一次使用時負責匯入舊資料
+    append(row)   保存一筆新紀錄，回傳是否需要呼叫 compact()
+    compact(rows) 以完整的紀錄重寫儲存 (不需要時可以什麼都不做)
+    flush()       確保已 append 的紀錄寫入
+    close()
+
+JsonlBackend 為 append-only 的 JSON-lines 紀錄檔；SqliteBackend 使用 SQLite 的
+WAL 模式，並把短時間內連續完成的紀錄合併在同一個 transaction 提交 (group
+commit)，最多延遲 GROUP_COMMIT_DELAY 秒或 GROUP_COMMIT_SIZE 筆。
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+RANKING_FILE = "rankings.json"  # 舊版整包 JSON 排行榜 (只在第一次啟動時匯入)
+RANKING_LOG = "rankings.jsonl"  # append-only 排行榜紀錄
+RANKING_DB = "rankings.db"  # SQLite 排行榜資料庫
+COMPACT_EVERY = 1000  # 每追加幾筆就整理一次紀錄檔
+GROUP_COMMIT_SIZE = 64  # 累積幾筆就提交一次
+GROUP_COMMIT_DELAY = 0.2  # 最早一筆未提交的紀錄最多等待的秒數
+
+def read_legacy(path):
+    # 讀取舊版整包 JSON 排行榜，檔案不存在或毀損時回傳空的 list
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        try:
+            return json.loads(f.read().decode("utf-8"))
+        except ValueError:  # JSON 格式錯誤或 UTF-8 解碼失敗
+            return []
+
+def read_log(path):
+    # 讀取 JSON-lines 紀錄檔；以二進位讀取後逐行解碼，多位元組字元被截斷的行也只略過該行
+    rows = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line.decode("utf-8")))
+            except ValueError:  # JSON 格式錯誤或 UTF-8 解碼失敗
+                continue  # 寫到一半中斷的紀錄直接略過，不影響其他資料
+    return rows
+
+class JsonlBackend:
+    def __init__(self, log_path=RANKING_LOG, legacy_path=RANKING_FILE, compact_every=COMPACT_EVERY):
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self.compact_every = compact_every
+        self.appended = 0  # 上次整理後追加的筆數
+        self.log_file = None  # append 模式開啟的紀錄檔
+
+    def load(self):
+        # 載入紀錄；沒有紀錄檔時從舊版 rankings.json 匯入一次
+        if os.path.exists(self.log_path):
+            return read_log(self.log_path)
+        rows = read_legacy(self.legacy_path)
+        self.compact(rows)
+        return rows
+
+    def append(self, row):
+        # 追加一行紀錄，累積到 compact_every 筆時要求整理紀錄檔
+        if self.log_file is None:
+            self.log_file = open(self.log_path, "a", encoding="utf-8")
+        self.log_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.log_file.flush()
+        self.appended += 1
+        return self.appended >= self.compact_every
+
+    def compact(self, rows):
+        # 以完整內容重寫紀錄檔，寫入暫存檔後再取代，避免中斷時毀損
+        self.close()
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.log_path)
+        self.appended = 0
+
+    def flush(self):
+        pass  # 每次 append 都已寫入
+
+    def close(self):
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+class SqliteBackend:
+    def __init__(self, db_path=RANKING_DB, log_path=RANKING_LOG, legacy_path=RANKING_FILE,
+                 commit_size=GROUP_COMMIT_SIZE, commit_delay=GROUP_COMMIT_DELAY):
+        self.db_path = db_path
+        self.log_path = log_path  # 匯入用：JSON-lines 紀錄檔
+        self.legacy_path = legacy_path  # 匯入用：舊版 rankings.json
+        self.commit_size = commit_size
+        self.commit_delay = commit_delay
+        self.conn = None
+        self.pending = 0  # 尚未提交的筆數
+        self.pending_since = None  # 最早一筆未提交紀錄的時間
+
+    def connect(self):
+        # 伺服器可能在其他執行緒建立 store，因此不限制使用的執行緒 (同時只有一個執行緒使用)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rankings (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                guesses INTEGER NOT NULL,
+                time REAL NOT NULL,
+                finish_time TEXT
+            );
+            CREATE INDEX IF NOT EXISTS rankings_by_time ON rankings (length, time, guesses, finish_time);
+            CREATE INDEX IF NOT EXISTS rankings_by_name ON rankings (name, length);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        return conn
+
+    def load(self):
+        if self.conn is None:
+            self.conn = self.connect()
+        self.migrate()
+        cursor = self.conn.execute(
+            "SELECT name, length, guesses, time, finish_time FROM rankings ORDER BY length, time, guesses, finish_time")
+        rows = []
+        for name, length, guesses, duration, finish_time in cursor:
+            row = {"name": name, "guesses": guesses, "time": duration, "finish_time": finish_time}
+            if length:
+                row["length"] = length  # 與其他後端一致，舊版紀錄不帶長度
+            rows.append(row)
+        return rows
+
+    def migrate(self):
+        # 第一次使用時匯入 JSON-lines 紀錄檔 (或更舊的 rankings.json)，之後不再讀取
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return
+        if os.path.exists(self.log_path):
+            rows = read_log(self.log_path)
+        else:
+            rows = read_legacy(self.legacy_path)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO rankings (name, length, guesses, time, finish_time) VALUES (?, ?, ?, ?, ?)",
+                [self.values(row) for row in rows])
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(len(rows)),))
+
+    @staticmethod
+    def values(row):
+        return (row["name"], row.get("length", 0), row["guesses"], row["time"], row.get("finish_time"))
+
+    def append(self, row):
+        # 寫入 transaction，累積到 commit_size 筆或超過 commit_delay 秒才提交
+        if self.conn is None:
+            self.conn = self.connect()
+        self.conn.execute(
+            "INSERT INTO rankings (name, length, guesses, time, finish_time) VALUES (?, ?, ?, ?, ?)", self.values(row))
+        self.pending += 1
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+        if self.pending >= self.commit_size or time.monotonic() - self.pending_since >= self.commit_delay:
+            self.flush()
+        return False
+
+    def compact(self, rows):
+        pass  # 資料庫不需要整理
+
+    def flush(self):
+        # 提交目前的 transaction；伺服器會定期呼叫，確保延遲不超過 commit_delay
+        if self.pending and self.conn is not None:
+            self.conn.commit()
+        self.pending = 0
+        self.pending_since = None
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+BACKENDS = {
+    "sqlite": SqliteBackend,
+    "jsonl": JsonlBackend,
+}
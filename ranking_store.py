@@ -0,0 +1,183 @@
+"""排行榜儲存
+
+排行榜依答案長度分成各自獨立的 RankingPartition，每個分區以排序好的 list
+保存在記憶體，並另外維護一份平行的排序 key (time, guesses, finish_time)，
+插入時用 bisect 找位置，名次就是在該分區插入的位置，不需要重新排序或再掃描
+其他長度的紀錄。舊版沒有記錄長度的紀錄歸在長度 0 的分區。
+紀錄的持久化交給 ranking_backends 中的儲存後端 (預設為 SQLite)。
+
+查詢 (前 K 名、分頁、個人最佳、個人名次附近) 只取需要的那一段 rows，
+另以 best 記錄每位使用者在各長度的最佳成績；查詢結果快取到下一次插入為止。
+
+伺服器以 load_in_background() 在背景執行緒載入，socket 不必等排行榜就能開始
+服務；載入完成前使用排行榜的方法會等待載入結束，event loop 上的呼叫端應先以
+load_status() 確認已載入。載入失敗時插入與查詢一律拋出例外，不會在沒有讀到的
+資料上寫入或整理紀錄。
+"""
+
+import bisect
+import threading
+
+from ranking_backends import BACKENDS
+
+DEFAULT_BACKEND = "sqlite"
+QUERY_CACHE_SIZE = 256  # 查詢快取最多保留的結果數
+QUERY_KINDS = ("top", "user", "around")
+LEGACY_LENGTH = 0  # 舊版紀錄沒有答案長度
+
+def sort_key(row):
+    # 先比用時，再比猜測次數，最後比完成時間
+    return (row["time"], row["guesses"], row.get("finish_time") or "")
+
+def length_of(row):
+    return row.get("length", LEGACY_LENGTH)
+
+class RankingPartition:
+    """單一答案長度的排行榜"""
+
+    def __init__(self, rows=()):
+        self.rows = sorted(rows, key=sort_key)
+        self.keys = [sort_key(row) for row in self.rows]  # 與 rows 平行的排序 key，供 bisect 使用
+
+    def __len__(self):
+        return len(self.rows)
+
+    def insert(self, row):
+        # 插入一筆紀錄並回傳名次 (1 起算)，key 相同時排在既有紀錄之後
+        key = sort_key(row)
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.rows.insert(index, row)
+        return index + 1
+
+    def rank_of(self, row):
+        # row 目前的名次 (1 起算)，key 相同的紀錄依插入順序
+        index = bisect.bisect_left(self.keys, sort_key(row))
+        while self.rows[index] is not row:
+            index += 1
+        return index + 1
+
+    def slice(self, start, k):
+        # 第 start+1 名起的 k 筆 [(名次, row)]
+        return [(start + i + 1, row) for i, row in enumerate(self.rows[start:start + k])]
+
+class RankingStore:
+    def __init__(self, backend=None):
+        self.backend = backend or BACKENDS[DEFAULT_BACKEND]()  # 儲存後端 (ranking_backends)
+        self.partitions = {}  # 答案長度 → RankingPartition
+        self.best = {}  # (答案長度, 使用者名稱) → 該使用者在該長度的最佳紀錄
+        self.query_cache = {}  # 查詢參數 → 結果，插入時清空
+        self.loaded = threading.Event()  # 載入完成 (或失敗) 後設定
+        self.loading = False
+        self.load_error = None  # 背景載入失敗時的例外
+
+    def __len__(self):
+        self.wait_loaded()
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def __iter__(self):
+        # 依長度、再依名次列出所有紀錄
+        self.wait_loaded()
+        for length in sorted(self.partitions):
+            yield from self.partitions[length].rows
+
+    def load_in_background(self):
+        # 在背景執行緒載入 (只執行一次)；載入完成前呼叫其他方法會等待
+        if self.loading or self.loaded.is_set():
+            return
+        self.loading = True
+        threading.Thread(target=self.load, name="rankings-load", daemon=True).start()
+
+    def wait_loaded(self):
+        # 等待載入結束；載入失敗時拋出例外，避免在沒有讀到的資料上插入、查詢或整理紀錄
+        self.loaded.wait()
+        if self.load_error is not None:
+            raise RuntimeError(f"rankings failed to load: {self.load_error}")
+
+    def load_status(self):
+        """不等待地回傳 (是否已載入結束, 載入失敗時的錯誤訊息)"""
+        if not self.loaded.is_set():
+            return False, None
+        return True, None if self.load_error is None else str(self.load_error)
+
+    def load(self):
+        # 由儲存後端載入所有紀錄並建立各長度的分區 (第一次使用時後端會匯入舊資料)
+        try:
+            self.build(self.backend.load())
+        except Exception as e:
+            self.load_error = e
+            if not self.loading:
+                raise
+        finally:
+            self.loading = False
+            self.loaded.set()
+
+    def build(self, rows):
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(length_of(row), []).append(row)
+        self.partitions = {length: RankingPartition(group) for length, group in grouped.items()}
+        self.best = {}
+        for length, partition in self.partitions.items():
+            for row in partition.rows:
+                self.best.setdefault((length, row["name"]), row)  # 分區已排序，第一筆就是最佳成績
+        self.query_cache.clear()
+
+    def insert(self, row):
+        # 插入一筆紀錄並回傳在該長度排行榜的名次 (1 起算)
+        self.wait_loaded()
+        length = length_of(row)
+        partition = self.partitions.get(length)
+        if partition is None:
+            partition = self.partitions[length] = RankingPartition()
+        rank = partition.insert(row)
+        best = self.best.get((length, row["name"]))
+        if best is None or sort_key(row) < sort_key(best):
+            self.best[(length, row["name"])] = row
+        self.query_cache.clear()
+        if self.backend.append(row):
+            self.backend.compact(self)
+        return rank
+
+    def query(self, kind="top", name=None, k=10, offset=0, length=LEGACY_LENGTH):
+        """查詢某個答案長度的排行榜，回傳 [(名次, row)]
+
+        kind 為 "top" 時回傳第 offset+1 名起的 k 筆；"user" 回傳 name 的最佳成績；
+        "around" 回傳 name 最佳成績及其前後各 k 筆。結果會快取到下一次插入。
+        """
+        if kind not in QUERY_KINDS:
+            raise ValueError(f"unknown ranking query: {kind}")
+        self.wait_loaded()
+        key = (kind, name, k, offset, length)
+        result = self.query_cache.get(key)
+        if result is None:
+            if len(self.query_cache) >= QUERY_CACHE_SIZE:
+                self.query_cache.clear()
+            result = self.query_cache[key] = self.run_query(kind, name, k, offset, length)
+        return result
+
+    def run_query(self, kind, name, k, offset, length):
+        partition = self.partitions.get(length)
+        if partition is None:
+            return []
+        if kind == "top":
+            return partition.slice(max(0, offset), k)
+        best = self.best.get((length, name))
+        if best is None:
+            return []
+        rank = partition.rank_of(best)
+        if kind == "user":
+            return [(rank, best)]
+        return partition.slice(max(0, rank - 1 - k), 2 * k + 1)
+
+    def snapshot(self):
+        # 回傳目前排行榜的複本 (供其他程序讀取)
+        return list(self)
+
+    def flush(self):
+        # 要求儲存後端提交尚未寫入的紀錄
+        self.backend.flush()
+
+    def close(self):
+        self.loaded.wait()  # 等背景載入結束，避免關閉使用中的後端
+        self.backend.close()
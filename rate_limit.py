@@ -0,0 +1,61 @@
+"""token bucket 速率限制
+
+TokenBuckets 為每個 key 維護一個 bucket，每秒補充 rate 個 token，最多累積 burst 個；
+每個封包消耗一個 token，沒有 token 時丟棄。伺服器使用兩層：
+    每個來源位址 (ip, port)   DEFAULT_RATE，NAT 後的不同玩家互不影響
+    每個來源 IP (所有 port 合計) DEFAULT_HOST_RATE，同一台主機換 port 也無法取得新的額度
+已補滿的 bucket 與不存在的 bucket 等價，因此 prune() 可以隨時移除它們；bucket 數
+達到 max_keys 時 (例如大量偽造的來源位址) 再移除最久沒有更新的一部分。持續送出
+封包、正在被限制的來源一直在更新，不會因此被移除而重新取得額度。
+"""
+
+import heapq
+import time
+
+DEFAULT_RATE = 200.0  # 每個來源位址每秒允許的封包數
+DEFAULT_HOST_RATE = 2000.0  # 每個來源 IP (所有 port 合計) 每秒允許的封包數
+BURST_SECONDS = 2.0  # 最多可累積幾秒份的 token
+MAX_BUCKETS = 65536  # 同時追蹤的 key 上限
+EVICT_FRACTION = 8  # 補滿的 bucket 移除後仍達上限時，一次移除最久沒有更新的 1/8
+
+class TokenBuckets:
+    def __init__(self, rate=DEFAULT_RATE, burst=None, max_keys=MAX_BUCKETS, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or rate * BURST_SECONDS
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets = {}  # key → [剩餘 token, 上次更新時間]
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def allow(self, key):
+        # 消耗 key 的一個 token，回傳是否允許
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.prune(now)
+            self.buckets[key] = [self.burst - 1, now]
+            return True
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def prune(self, now=None):
+        # 移除已補滿的 bucket；仍達到上限時移除最久沒有更新的一部分
+        now = self.clock() if now is None else now
+        full = [key for key, (tokens, last) in self.buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self.buckets[key]
+        if len(self.buckets) >= self.max_keys:
+            count = len(self.buckets) - self.max_keys + max(1, self.max_keys // EVICT_FRACTION)
+            for key in heapq.nsmallest(count, self.buckets, key=lambda key: self.buckets[key][1]):
+                del self.buckets[key]
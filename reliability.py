@@ -0,0 +1,80 @@
+"""UDP 請求的序號、重送與重複封包判斷
+
+client 端每個需要回覆的請求 ([Guess]、[USERINFO]、[Replay]) 都帶一個 16-bit
+序號，server 的回覆帶回同一個序號當作確認。Retransmitter 採 stop-and-wait：
+一次只有一個請求在路上，逾時就以指數退避重送，超過次數上限就放棄。
+server 端以 is_newer() 判斷序號新舊：重複的請求只重送上次的回覆，不會再
+計分或計算次數。
+"""
+
+import threading
+import time
+from collections import deque
+
+SEQ_MODULO = 1 << 16
+INITIAL_RTO = 0.3  # 第一次重送前等待的秒數
+MAX_RTO = 3.0  # 重送間隔上限
+MAX_ATTEMPTS = 6  # 含第一次傳送的最多傳送次數
+
+def is_newer(seq, last):
+    # 以 16-bit 環狀序號判斷 seq 是否比 last 新
+    return 0 < (seq - last) % SEQ_MODULO < SEQ_MODULO // 2
+
+class Retransmitter:
+    def __init__(self, send, initial_rto=INITIAL_RTO, max_rto=MAX_RTO, max_attempts=MAX_ATTEMPTS, clock=time.monotonic):
+        self.send = send  # send(payload) 實際送出封包
+        self.initial_rto = initial_rto
+        self.max_rto = max_rto
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.next_seq = 1  # 0 保留不用
+        self.waiting = deque()  # 尚未送出的 (seq, payload)
+        self.inflight = None  # 目前在路上的 [seq, payload, 已傳送次數, 重送時間, rto]
+        self.lock = threading.Lock()  # ack() 與 poll() 可能在不同執行緒
+
+    def submit(self, build):
+        """以 build(seq) 產生封包內容並排入傳送，回傳配發的 seq"""
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq = seq % (SEQ_MODULO - 1) + 1
+            self.waiting.append((seq, build(seq)))
+            self.pump()
+        return seq
+
+    def pump(self):
+        # 目前沒有請求在路上時送出下一個 (呼叫前須持有 lock)
+        if self.inflight is None and self.waiting:
+            seq, payload = self.waiting.popleft()
+            self.inflight = [seq, payload, 1, self.clock() + self.initial_rto, self.initial_rto]
+            self.send(payload)
+
+    def ack(self, seq):
+        """收到帶 seq 的回覆；是目前等待中的請求時回傳 True，重複或過期的回覆回傳 False"""
+        with self.lock:
+            if self.inflight is None or self.inflight[0] != seq:
+                return False
+            self.inflight = None
+            self.pump()
+            return True
+
+    def poll(self):
+        """定期呼叫：逾時的請求重送，超過次數上限則放棄並回傳其 seq"""
+        with self.lock:
+            if self.inflight is None:
+                return None
+            seq, payload, attempts, deadline, rto = self.inflight
+            if self.clock() < deadline:
+                return None
+            if attempts >= self.max_attempts:
+                self.inflight = None
+                self.pump()
+                return seq
+            rto = min(rto * 2, self.max_rto)
+            self.inflight = [seq, payload, attempts + 1, self.clock() + rto, rto]
+            self.send(payload)
+            return None
+
+    def clear(self):
+        with self.lock:
+            self.waiting.clear()
+            self.inflight = None
@@ -0,0 +1,174 @@
+"""重播 session_log 紀錄檔的工具
+
+讀取伺服器以 --record 錄下的封包紀錄，每個錄到的 client 位址以一個新的
+ephemeral port 重新送出它當初送給伺服器的封包 (dir 為 in)；紀錄中伺服器送出
+的封包 (dir 為 out) 則等待新伺服器的回覆，並量測送出請求到收到回覆的延遲。
+二進位封包的 session id 與 [Rankings] 查詢的 token 會換成新伺服器在 [Ack] 中配發的值。
+
+--speed 1 依錄製時的時間間隔重播，--speed 0 不等待、以最快速度重播
+(每個 client 仍依序送出，收到回覆後才送下一個請求)。重播的 [Connecting] 會帶上
+";replay=<錄到的位址>"，新伺服器以 --replay-answers 讀取同一個紀錄檔時，每個
+client 依序拿到當初各局的答案 (固定答案 --answer 也可以)：
+    python game_server.py --quiet --record traffic.jsonl
+    python game_server.py --quiet --port 5001 --replay-answers traffic.jsonl
+    python replay.py traffic.jsonl --port 5001 --speed 0
+[Ready] 與猜測回覆 (COMPARED_EVENTS) 會和紀錄逐一比對 (二進位封包不比對
+session id)，不同的數量與前 MAX_MISMATCHES 筆內容列在結果的 mismatches。
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import defaultdict
+
+import wire
+from load_test import PlayerProtocol, summarize
+from session_log import payload_of, read_records
+
+COMPARED_EVENTS = ("ready", "reply")  # 與紀錄比對內容的回覆種類 (其他回覆含有 token、時間等每次不同的內容)
+MAX_MISMATCHES = 20  # 結果中列出的不符回覆筆數上限
+
+def comparable(data):
+    # 比對用的回覆內容：二進位封包去掉 header 中的 session id
+    if wire.is_binary(data):
+        opcode, _, body = wire.unpack(data)
+        return (opcode, body)
+    return data
+class ReplayStats:
+    def __init__(self):
+        self.sent = 0  # 送出的封包數
+        self.replies = 0  # 收到的回覆數
+        self.missing = 0  # 紀錄中有、但逾時沒有收到的回覆數
+        self.mismatched = 0  # 內容與紀錄不同的回覆數
+        self.mismatches = []  # 前 MAX_MISMATCHES 筆不同的回覆
+        self.latency = defaultdict(list)  # 請求種類 → 送出到收到第一個回覆的秒數
+
+class ReplayClient:
+    """依序重播一個錄到的 client 位址的封包"""
+
+    def __init__(self, records, origin, server_address, options, stats):
+        self.records = records
+        self.origin = origin  # 紀錄中第一個事件的時間，重播從這裡開始計時
+        self.address = records[0]["addr"]  # 錄到的 client 位址，[Connecting] 時告訴伺服器
+        self.server_address = server_address
+        self.options = options
+        self.stats = stats
+        self.transport = None
+        self.protocol = None
+        self.session_id = 0  # 新伺服器配發的 session id
+        self.token = ""  # 新伺服器配發的 token
+        self.last_event = None  # 最近一個還沒收到回覆的請求 (種類, 送出時間)
+
+    async def run(self, started_at):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            PlayerProtocol, remote_addr=self.server_address)
+        try:
+            for record in self.records:
+                if record["dir"] == "in":
+                    if self.options.speed > 0:
+                        delay = started_at + (record["t"] - self.origin) / self.options.speed - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    self.send(record)
+                else:
+                    await self.receive(record)
+        finally:
+            self.transport.close()
+
+    def send(self, record):
+        data = payload_of(record)
+        if wire.is_binary(data):
+            opcode, _, body = wire.unpack(data)
+            data = wire.pack(opcode, self.session_id, body)
+        elif data.startswith(b"[Connecting]:"):
+            data += f";replay={self.address}".encode()
+        elif self.token and data.startswith(b"[Rankings]:"):
+            data = re.sub(rb";token=\w*", f";token={self.token}".encode(), data)
+        self.transport.sendto(data)
+        self.stats.sent += 1
+        self.last_event = (record["event"], time.perf_counter())
+
+    async def receive(self, record):
+        try:
+            data = await asyncio.wait_for(self.protocol.queue.get(), self.options.reply_timeout)
+        except asyncio.TimeoutError:
+            self.stats.missing += 1
+            return
+        self.stats.replies += 1
+        if self.last_event is not None:
+            event, sent_at = self.last_event
+            self.stats.latency[event].append(time.perf_counter() - sent_at)
+            self.last_event = None
+        if record["event"] in COMPARED_EVENTS and comparable(data) != comparable(payload_of(record)):
+            self.stats.mismatched += 1
+            if len(self.stats.mismatches) < MAX_MISMATCHES:
+                self.stats.mismatches.append({
+                    "addr": self.address, "t": record["t"], "event": record["event"],
+                    "expected": record.get("text", record.get("hex")),
+                    "got": data.hex() if wire.is_binary(data) else data.decode(errors="replace"),
+                })
+        if data.startswith(b"[Ack]:"):
+            options = wire.parse_options(data.decode(errors="replace"))
+            if options.get("sid"):
+                self.session_id = int(options["sid"])
+            self.token = options.get("token", self.token)
+
+async def run_replay(options):
+    records = read_records(options.log)
+    by_address = defaultdict(list)
+    for record in records:
+        by_address[record["addr"]].append(record)
+    origin = records[0]["t"] if records else 0
+    stats = ReplayStats()
+    server_address = (options.host, options.port)
+    semaphore = asyncio.Semaphore(options.concurrency)
+
+    async def run_client(client_records, started_at):
+        async with semaphore:
+            await ReplayClient(client_records, origin, server_address, options, stats).run(started_at)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(client_records, start) for client_records in by_address.values()))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "log": options.log,
+        "speed": options.speed,
+        "sessions": len(by_address),
+        "recorded_span_s": round(records[-1]["t"] - records[0]["t"], 3) if records else 0,
+        "elapsed_s": round(elapsed, 3),
+        "packets_sent": stats.sent,
+        "packets_per_s": round(stats.sent / elapsed, 1) if elapsed else None,
+        "replies": stats.replies,
+        "missing_replies": stats.missing,
+        "mismatched_replies": stats.mismatched,
+        "mismatches": stats.mismatches,
+        "latency": {event: summarize(samples) for event, samples in sorted(stats.latency.items())},
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="重播 UDP猜字串 伺服器的封包紀錄")
+    parser.add_argument("log", help="game_server.py --record 錄下的紀錄檔")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--speed", type=float, default=1.0, help="重播速度倍率，0 為不等待的最快速度")
+    parser.add_argument("--concurrency", type=int, default=200, help="同時重播的 client 數")
+    parser.add_argument("--reply-timeout", type=float, default=1.0, help="等待每個回覆的秒數，逾時算遺失")
+    parser.add_argument("--output", help="將結果 JSON 寫入檔案 (預設輸出到 stdout)")
+    return parser
+
+def main():
+    options = build_parser().parse_args()
+    result = asyncio.run(run_replay(options))
+    text = json.dumps(result, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
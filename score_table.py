@@ -0,0 +1,159 @@
+"""預先計算的 guess×answer 計分表
+
+長度 L 的答案共有 P(16, L) 種 (依 itertools.permutations 的順序編號)，計分表
+是 P(16, L)×P(16, L) 的 uint8 矩陣，第 g 列第 a 欄為猜測 g 對答案 a 的回覆
+編碼 A * 17 + B (與 solver.encode_result 相同)。A/B 的計算對猜測與答案對稱，
+因此第 a 列也就是答案 a 對所有猜測的回覆。
+
+表以檔案存放，讀取端以 mmap 唯讀映射，不複製到各程序的記憶體；多個 worker
+與解題機器人共用作業系統的 page cache。沒有表時由呼叫端退回即時計分。
+各長度的大小：長度 2 約 56 KB、長度 3 約 11 MB、長度 4 約 1.9 GB，因此預設
+只產生到長度 3：
+    python score_table.py                 # 產生 score_tables/scores-{1,2,3}.u8
+    python score_table.py --max-length 4  # 需要約 1.9 GB 的磁碟空間
+"""
+
+import argparse
+import itertools
+import math
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+from scoring import AnswerScorer, HEX_DIGITS
+
+TABLE_DIR = "score_tables"  # 計分表所在的目錄 (相對於執行目錄)
+DEFAULT_MAX_LENGTH = 3  # 預設產生的最大長度
+MAX_TABLE_LENGTH = 4  # 可以產生的最大長度 (長度 5 需要約 274 GB)
+MAGIC = b"ABST"
+HEADER = struct.Struct("!4sBxxxI")  # magic、長度、P(16, 長度)
+
+def table_path(length, directory=TABLE_DIR):
+    return os.path.join(directory, f"scores-{length}.u8")
+
+@lru_cache(maxsize=None)
+def index_weights(length):
+    # 每個位置的數字在排列編號中的權重
+    return tuple(math.perm(len(HEX_DIGITS) - 1 - i, length - 1 - i) for i in range(length))
+
+def permutation_index(values):
+    """values 在 itertools.permutations(range(16), len(values)) 中的編號；有重複數字時回傳 None"""
+    index = 0
+    used = 0
+    for v, weight in zip(values, index_weights(len(values))):
+        bit = 1 << v
+        if used & bit:
+            return None
+        index += (v - (used & (bit - 1)).bit_count()) * weight
+        used |= bit
+    return index
+
+@lru_cache(maxsize=None)
+def guess_indices(length):
+    """長度 length 的猜測 → 編號，同時以字串與數字 tuple 為 key (查表比逐位計算編號快)"""
+    indices = {}
+    for index, values in enumerate(itertools.permutations(range(len(HEX_DIGITS)), length)):
+        indices[values] = index
+        indices["".join(HEX_DIGITS[v] for v in values)] = index
+    return indices
+
+class ScoreTable:
+    """以 mmap 映射的計分表 (唯讀)"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.length, self.size = HEADER.unpack_from(self.data)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.size * self.size:
+            self.data.close()
+            raise ValueError(f"invalid score table: {path}")
+        self.matrix = None  # 有 NumPy 時為不複製資料的 size×size 陣列
+        try:
+            import numpy as np
+        except ImportError:
+            pass
+        else:
+            self.matrix = np.frombuffer(self.data, dtype=np.uint8, offset=HEADER.size).reshape(self.size, self.size)
+
+    def row(self, index):
+        # 第 index 列 (不複製的 memoryview)
+        start = HEADER.size + index * self.size
+        return memoryview(self.data)[start:start + self.size]
+
+    def code(self, guess_index, answer_index):
+        return self.data[HEADER.size + guess_index * self.size + answer_index]
+
+@lru_cache(maxsize=None)
+def load_table(length, directory=TABLE_DIR):
+    """載入長度 length 的計分表；檔案不存在或格式不符時回傳 None (每個程序只讀取一次)"""
+    path = table_path(length, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = ScoreTable(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    return table if table.length == length else None
+
+def build_table(length, directory=TABLE_DIR):
+    """產生長度 length 的計分表檔案 (寫入暫存檔後再取代)，回傳檔案路徑"""
+    from solver import CandidateTable  # solver 也會讀取計分表，延後載入避免循環 import
+
+    if not 1 <= length <= MAX_TABLE_LENGTH:
+        raise ValueError(f"length must be 1~{MAX_TABLE_LENGTH}")
+    candidates = CandidateTable(length, scores=None)  # 以即時計分產生，不讀取舊的表
+    indices = candidates.all_indices()
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(length, directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, length, candidates.size))
+        for guess in candidates.digits:
+            codes = candidates.score(tuple(int(d) for d in guess), indices)
+            f.write(codes.astype("uint8").tobytes() if hasattr(codes, "astype") else bytes(codes))
+    os.replace(tmp_path, path)
+    return path
+
+class TableScorer(AnswerScorer):
+    """以計分表查詢的 AnswerScorer；有重複字元等查不到的猜測退回即時計分"""
+
+    __slots__ = ("row", "indices")
+
+    def __init__(self, answer, table):
+        super().__init__(answer)
+        self.indices = guess_indices(self.length)
+        self.row = table.row(self.indices[answer])
+
+    def score(self, guess):
+        index = self.indices.get(guess)
+        if index is None:
+            return super().score(guess)
+        return divmod(self.row[index], 17)
+
+    def score_values(self, values):
+        index = self.indices.get(tuple(values))
+        if index is None:
+            return super().score_values(values)
+        return divmod(self.row[index], 17)
+
+def scorer_for(answer):
+    # 有該長度的計分表時使用 TableScorer，否則使用即時計分的 AnswerScorer
+    table = load_table(len(answer))
+    if table is None:
+        return AnswerScorer(answer)
+    return TableScorer(answer, table)
+
+def main():
+    parser = argparse.ArgumentParser(description="產生 UDP猜字串 的 guess×answer 計分表")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH, help=f"產生長度 1~N 的表 (N 最大 {MAX_TABLE_LENGTH})")
+    parser.add_argument("--dir", default=TABLE_DIR, help="輸出目錄")
+    args = parser.parse_args()
+    if not 1 <= args.max_length <= MAX_TABLE_LENGTH:
+        parser.error(f"--max-length 應介於 1~{MAX_TABLE_LENGTH}")
+    for length in range(1, args.max_length + 1):
+        path = build_table(length, args.dir)
+        print(f"{path}: {os.path.getsize(path)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""A/B 計分引擎
+
+答案與猜測都由不重複的 16 進位字元組成，因此答案可以預先編碼成
+16-bit 的字元 mask 與「字元 → 位置」對照表。之後每次猜測只需要
+一次 popcount 與逐位置比對，不需要 count() 或建立 set。
+"""
+
+HEX_DIGITS = "0123456789ABCDEF"
+DIGIT_VALUE = {c: i for i, c in enumerate(HEX_DIGITS)}  # 字元 → 0~15
+
+def encode(code):
+    """將字串編碼為 (mask, 各位置的數值)，含非 16 進位字元時丟出 ValueError"""
+    mask = 0
+    values = []
+    for c in code:
+        v = DIGIT_VALUE.get(c)
+        if v is None:
+            raise ValueError(f"invalid character {c!r}")
+        mask |= 1 << v
+        values.append(v)
+    return mask, values
+
+class AnswerScorer:
+    """預先編碼好的答案，提供 O(答案長度) 且無額外配置的計分"""
+
+    __slots__ = ("answer", "length", "mask", "positions")
+
+    def __init__(self, answer):
+        mask, values = encode(answer)
+        if mask.bit_count() != len(answer):
+            raise ValueError("answer contains duplicate characters")
+        self.answer = answer
+        self.length = len(answer)
+        self.mask = mask  # 答案中出現的字元 (bit i 代表字元 HEX_DIGITS[i])
+        self.positions = [-1] * 16  # 每個字元在答案中的位置，不存在為 -1
+        for i, v in enumerate(values):
+            self.positions[v] = i
+
+    def score(self, guess):
+        """回傳 (A, B)；猜測含非 16 進位字元時丟出 ValueError"""
+        positions = self.positions
+        mask = 0
+        A = 0
+        for i, c in enumerate(guess):
+            v = DIGIT_VALUE.get(c)
+            if v is None:
+                raise ValueError(f"invalid character {c!r}")
+            mask |= 1 << v
+            if positions[v] == i:
+                A += 1
+        return A, (mask & self.mask).bit_count() - A
+
+    def score_values(self, values):
+        """以 0~15 的數值序列計分 (二進位封包不需要先轉成字串)，回傳 (A, B)"""
+        positions = self.positions
+        mask = 0
+        A = 0
+        for i, v in enumerate(values):
+            mask |= 1 << v
+            if positions[v] == i:
+                A += 1
+        return A, (mask & self.mask).bit_count() - A
+
+    def score_many(self, guesses):
+        """一次計算多個猜測，回傳 [(A, B), ...]"""
+        score = self.score
+        return [score(guess) for guess in guesses]
+
+    def is_win(self, result):
+        return result[0] == self.length
@@ -0,0 +1,114 @@
+"""遊戲 session 的封包事件紀錄
+
+伺服器啟用 --record 時，每個收到與送出的封包都以 JSON-lines 依序追加到紀錄檔
+(每次啟動重新建立檔案)，一行一個事件：
+    {"t": 1.234567, "addr": "127.0.0.1:50363", "dir": "in", "event": "guess", "text": "[Guess]: 0123 #1"}
+t 為開始紀錄後經過的秒數，dir 為 in (client→伺服器) 或 out (伺服器→client)，
+event 為封包種類 (connect、ack、ready、guess、reply、finish …)。
+文字封包存在 text，二進位封包 (wire.py) 以 hex 存在 hex。
+送出 [Ready] 的事件另外記錄該局的答案 (answer)，伺服器以 --replay-answers 讀取
+紀錄檔時，replay.py 重播的每個 client 會依序拿到當初的答案，回覆才能逐一比對。
+
+寫入使用緩衝，伺服器每 RECORD_FLUSH_INTERVAL 秒與關閉時 flush。
+紀錄檔可用 replay.py 重新送給伺服器，作為可重現的吞吐量與延遲測試。
+"""
+
+import json
+import time
+
+import wire
+
+RECORD_FLUSH_INTERVAL = 1.0  # 定期把緩衝的事件寫入檔案 (秒)
+
+TEXT_EVENTS = (  # 文字封包的開頭 → 事件名稱
+    ("[Connecting]:", "connect"),
+    ("[Ack]:", "ack"),
+    ("[Ready]:", "ready"),
+    ("[Guess Reply]", "reply"),
+    ("[Guess]:", "guess"),
+    ("[USERINFO]", "finish"),
+    ("[Congratulations!]:", "finish"),
+    ("[Replay]", "replay"),
+    ("[Rankings]:", "rankings"),
+    ("[Stats]", "stats"),
+    ("[Timeout]:", "timeout"),
+    ("[Error]:", "error"),
+    ("QUIT", "quit"),
+)
+
+BINARY_EVENTS = {
+    wire.OP_READY: "ready",
+    wire.OP_GUESS: "guess",
+    wire.OP_REPLY: "reply",
+    wire.OP_ERROR: "reply",
+    wire.OP_REPLAY: "replay",
+    wire.OP_TIMEOUT: "timeout",
+    wire.OP_QUIT: "quit",
+    wire.OP_ACK: "ack",
+}
+
+def event_of(data):
+    # 封包種類，無法辨識時回傳 "other"
+    if wire.is_binary(data):
+        return BINARY_EVENTS.get(data[1], "other")
+    for prefix, event in TEXT_EVENTS:
+        if data.startswith(prefix.encode()):
+            return event
+    return "other"
+
+def encode_record(t, addr, direction, data, answer=None):
+    record = {"t": round(t, 6), "addr": f"{addr[0]}:{addr[1]}", "dir": direction, "event": event_of(data)}
+    if answer:
+        record["answer"] = answer
+    if wire.is_binary(data):
+        record["hex"] = data.hex()
+    else:
+        record["text"] = data.decode(errors="replace")
+    return json.dumps(record, ensure_ascii=False)
+
+def payload_of(record):
+    # 取回紀錄中的原始封包
+    if "hex" in record:
+        return bytes.fromhex(record["hex"])
+    return record["text"].encode()
+
+def read_records(path):
+    # 依時間順序讀取紀錄檔，寫到一半中斷的行直接略過
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    records.sort(key=lambda record: record["t"])
+    return records
+
+def recorded_answers(records):
+    # 每個錄到的 client 位址 → 依序各局的答案
+    answers = {}
+    for record in records:
+        if record["dir"] == "out" and "answer" in record:
+            answers.setdefault(record["addr"], []).append(record["answer"])
+    return answers
+
+class EventRecorder:
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.started_at = clock()
+        self.file = open(path, "w", encoding="utf-8")
+        self.count = 0  # 已記錄的事件數
+
+    def record(self, direction, addr, data, answer=None):
+        self.file.write(encode_record(self.clock() - self.started_at, addr, direction, data, answer) + "\n")
+        self.count += 1
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,282 @@
+"""猜數字 (Bulls and Cows) 解題器
+
+答案為 length 個不重複的 16 進位字元，所有可能的答案共有 P(16, length) 個。
+數量不超過 MATERIALIZE_LIMIT 時，會為該長度建立一次 CandidateTable (每個候選
+答案的各位數字與字元 mask)，候選集合只是這張表的 index 陣列；每次收到回覆
+就以向量化的 A/B 計分一次篩掉不符合的候選，再以 entropy 或 minimax 從候選中
+挑出最能區分剩餘答案的下一個猜測。第一步的猜測固定為 "0123..."，其依回覆
+分組的結果 (first move table) 每個長度只計算一次。
+
+候選數量太大時 (例如長度 7 以上) 不建立整張表，改以回溯搜尋逐一產生與所有
+歷史回覆相符的候選，只取一小批樣本來挑選下一個猜測。答案越長搜尋越慢，
+長度 12 以上可能在時限內找不到候選 (next_guess 會丟出 TimeoutError)。
+
+有安裝 NumPy 時使用向量化計算，否則退回純 Python (可建立的表也較小)。
+若已用 score_table.py 產生該長度的計分表，計分改為直接查表 (mmap，不需重算)。
+"""
+
+import itertools
+import math
+import random
+import time
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 為選用套件
+    np = None
+
+from scoring import HEX_DIGITS, DIGIT_VALUE
+from score_table import load_table, permutation_index
+
+MATERIALIZE_LIMIT = 6_000_000 if np is not None else 60_000  # 建立整張候選表的數量上限
+PROBE_COUNT = 64 if np is not None else 12  # 每次評估的候選猜測數
+TARGET_SAMPLE = 4096 if np is not None else 400  # 評估時抽樣的候選答案數
+STREAM_SAMPLE = 32  # 不建立候選表時，每次取樣的相符候選數
+STREAM_TIME_LIMIT = 0.5  # 取樣的時間上限 (秒)，至少會取得一個候選
+STREAM_GIVE_UP = 10.0  # 找不到任何候選時放棄的時間 (秒)
+HEARTBEAT_NODES = 256
+CODE_COUNT = 17 * 17  # 回覆 (A, B) 編碼為 A * 17 + B
+FULL_MASK = (1 << len(HEX_DIGITS)) - 1
+
+def encode_result(A, B):
+    return A * 17 + B
+
+def permutation_count(length):
+    return math.perm(len(HEX_DIGITS), length)
+
+@lru_cache(maxsize=1)
+def popcount16():
+    # 0~65535 每個數字的 bit 數對照表
+    return np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+class CandidateTable:
+    """某個長度的所有候選答案：digits[i] 為各位數字，masks[i] 為出現字元的 mask
+
+    scores 為該長度的 score_table.ScoreTable 時，score() 直接查表。
+    """
+
+    def __init__(self, length, scores=None):
+        self.length = length
+        self.scores = scores
+        self.size = permutation_count(length)
+        perms = itertools.permutations(range(len(HEX_DIGITS)), length)
+        if np is not None:
+            flat = np.fromiter(itertools.chain.from_iterable(perms), dtype=np.uint8, count=self.size * length)
+            self.digits = flat.reshape(self.size, length)
+            self.masks = np.bitwise_or.reduce(np.left_shift(np.uint16(1), self.digits.astype(np.uint16)), axis=1)
+        else:
+            self.digits = list(perms)
+            self.masks = [sum(1 << d for d in digits) for digits in self.digits]
+
+    def all_indices(self):
+        return np.arange(self.size, dtype=np.int32) if np is not None else list(range(self.size))
+
+    def score(self, guess, indices):
+        """guess (數字 tuple) 對 indices 中每個候選答案的回覆編碼"""
+        if self.scores is not None:
+            guess_index = permutation_index(guess)
+            if self.scores.matrix is not None:
+                return self.scores.matrix[guess_index, indices]
+            row = self.scores.row(guess_index)
+            return [row[i] for i in indices]
+        guess_mask = sum(1 << d for d in guess)
+        if np is not None:
+            digits = self.digits[indices]
+            A = (digits == np.array(guess, dtype=np.uint8)).sum(axis=1, dtype=np.int16)
+            common = popcount16()[self.masks[indices] & guess_mask].astype(np.int16)
+            return A * 17 + (common - A)
+        codes = []
+        for i in indices:
+            A = sum(a == b for a, b in zip(guess, self.digits[i]))
+            codes.append(A * 17 + (self.masks[i] & guess_mask).bit_count() - A)
+        return codes
+
+@lru_cache(maxsize=None)
+def candidate_table(length):
+    # 每個長度只建立一次候選表 (有計分表時一併使用)
+    return CandidateTable(length, load_table(length))
+
+@lru_cache(maxsize=None)
+def first_move_table(length):
+    """第一步固定猜 "0123..."，回傳 {回覆編碼: 相符候選的 index 陣列}"""
+    table = candidate_table(length)
+    indices = table.all_indices()
+    codes = table.score(tuple(range(length)), indices)
+    if np is not None:
+        return {int(code): indices[codes == code] for code in np.unique(codes)}
+    partitions = {}
+    for index, code in zip(indices, codes):
+        partitions.setdefault(code, []).append(index)
+    return partitions
+
+def first_guess(length):
+    return HEX_DIGITS[:length]
+
+class Solver:
+    def __init__(self, length, method="entropy", rng=None):
+        if not 1 <= length <= len(HEX_DIGITS):
+            raise ValueError(f"length must be 1~{len(HEX_DIGITS)}")
+        self.length = length
+        self.method = method  # "entropy" 或 "minimax"
+        self.rng = rng or random.Random()
+        self.history = []  # [(猜測數字 tuple, A, B)]
+        self.materialized = permutation_count(length) <= MATERIALIZE_LIMIT
+        self.candidates = None  # 相符候選在 CandidateTable 中的 index；None 代表尚未篩選
+
+    def update(self, guess, A, B):
+        """加入一次猜測的回覆並篩選候選"""
+        values = tuple(DIGIT_VALUE[c] for c in guess)
+        code = encode_result(A, B)
+        if self.materialized:
+            table = candidate_table(self.length)
+            if self.candidates is None and values == tuple(range(self.length)):
+                empty = np.empty(0, dtype=np.int32) if np is not None else []
+                self.candidates = first_move_table(self.length).get(code, empty)
+            else:
+                indices = self.candidates if self.candidates is not None else table.all_indices()
+                codes = table.score(values, indices)
+                if np is not None:
+                    self.candidates = indices[codes == code]
+                else:
+                    self.candidates = [i for i, c in zip(indices, codes) if c == code]
+        self.history.append((values, A, B))
+
+    def remaining(self):
+        """剩餘候選數量；未建立候選表時回傳 None"""
+        if not self.materialized:
+            return None
+        if self.candidates is None:
+            return permutation_count(self.length)
+        return len(self.candidates)
+
+    def next_guess(self):
+        """挑選下一個猜測
+
+        沒有任何相符候選時丟出 ValueError，長答案搜尋逾時則丟出 TimeoutError。
+        """
+        if not self.history:
+            return first_guess(self.length)
+        if self.materialized:
+            return self.pick_from_table()
+        return self.pick_from_stream()
+
+    def hint(self):
+        return {"guess": self.next_guess(), "remaining": self.remaining()}
+
+    def pick_from_table(self):
+        table = candidate_table(self.length)
+        pool = self.candidates
+        if len(pool) == 0:
+            raise ValueError("no candidate matches the replies")
+        if len(pool) <= 2:
+            return self.to_text(table.digits[pool[0]])
+        probes = self.sample(pool, PROBE_COUNT)
+        targets = self.sample(pool, TARGET_SAMPLE)
+        best = min(probes, key=lambda probe: self.rate(table.score(tuple(int(d) for d in table.digits[probe]), targets)))
+        return self.to_text(table.digits[best])
+
+    def pick_from_stream(self):
+        # 最多取 STREAM_SAMPLE 個相符候選；超過 STREAM_TIME_LIMIT 秒就用已取得的部分，
+        # 超過 STREAM_GIVE_UP 秒仍找不到任何候選則放棄
+        sample = []
+        start = time.perf_counter()
+        for candidate in self.iter_consistent(heartbeat=True):
+            elapsed = time.perf_counter() - start
+            if candidate is not None:
+                sample.append(candidate)
+            if len(sample) >= STREAM_SAMPLE or (sample and elapsed > STREAM_TIME_LIMIT):
+                break
+            if elapsed > STREAM_GIVE_UP:
+                raise TimeoutError("candidate search took too long")
+        if not sample:
+            raise ValueError("no candidate matches the replies")
+        if len(sample) <= 2:
+            return self.to_text(sample[0])
+        masks = [sum(1 << d for d in candidate) for candidate in sample]
+
+        def codes_for(probe):
+            probe_mask = sum(1 << d for d in probe)
+            codes = []
+            for candidate, mask in zip(sample, masks):
+                A = sum(a == b for a, b in zip(probe, candidate))
+                codes.append(A * 17 + (mask & probe_mask).bit_count() - A)
+            return codes
+        return self.to_text(min(sample, key=lambda probe: self.rate(codes_for(probe))))
+
+    def iter_consistent(self, heartbeat=False):
+        """以回溯搜尋逐一產生與所有回覆相符的候選 (隨機順序)
+
+        heartbeat 為 True 時每搜尋 HEARTBEAT_NODES 個節點額外產生一次 None，
+        讓呼叫端可以在找到候選前檢查時間。
+        """
+        length = self.length
+        rng = self.rng
+        history = [(guess, sum(1 << d for d in guess), A, A + B) for guess, A, B in self.history]
+        assigned = []
+        visited = 0
+
+        def search(pos, used, matched, common):
+            nonlocal visited
+            visited += 1
+            if heartbeat and visited % HEARTBEAT_NODES == 0:
+                yield None
+            if pos == length:
+                yield tuple(assigned)
+                return
+            left = length - pos - 1  # 這一位之後還剩的位置數
+            digits = list(range(len(HEX_DIGITS)))
+            rng.shuffle(digits)
+            for d in digits:
+                if used >> d & 1:
+                    continue
+                free = FULL_MASK & ~(used | 1 << d)  # 之後還能使用的字元
+                next_matched = []
+                next_common = []
+                for (guess, guess_mask, A, total), m, c in zip(history, matched, common):
+                    m += guess[pos] == d
+                    c += guess_mask >> d & 1
+                    if m > A or c > total:
+                        break
+                    # 之後最多還能再對中幾個位置、最少/最多還會出現幾個共同字元
+                    reachable = sum(free >> g & 1 for g in guess[pos + 1:])
+                    shared = (free & guess_mask).bit_count()
+                    forced = max(0, left - (free & ~guess_mask).bit_count())
+                    if m + reachable < A or c + min(left, shared) < total or c + forced > total:
+                        break
+                    next_matched.append(m)
+                    next_common.append(c)
+                else:
+                    assigned.append(d)
+                    yield from search(pos + 1, used | 1 << d, next_matched, next_common)
+                    assigned.pop()
+
+        return search(0, 0, [0] * len(history), [0] * len(history))
+
+    def rate(self, codes):
+        # 分數越小越好：minimax 取最大分組大小，entropy 取負的 entropy
+        if np is not None and not isinstance(codes, list):
+            counts = np.bincount(codes, minlength=CODE_COUNT)
+            if self.method == "minimax":
+                return int(counts.max())
+            p = counts[counts > 0] / len(codes)
+            return float((p * np.log2(p)).sum())
+        counts = {}
+        for code in codes:
+            counts[code] = counts.get(code, 0) + 1
+        if self.method == "minimax":
+            return max(counts.values())
+        total = len(codes)
+        return sum(n / total * math.log2(n / total) for n in counts.values())
+
+    def sample(self, pool, count):
+        if len(pool) <= count:
+            return pool
+        if np is not None:
+            generator = np.random.default_rng(self.rng.randrange(1 << 32))
+            return generator.choice(pool, count, replace=False)
+        return self.rng.sample(list(pool), count)
+
+    @staticmethod
+    def to_text(digits):
+        return "".join(HEX_DIGITS[int(d)] for d in digits)
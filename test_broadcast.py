@@ -0,0 +1,81 @@
+from broadcast import HEADER, Broadcaster, parse_topics
+
+def make_broadcaster(clock, **options):
+    sent = []
+    broadcaster = Broadcaster(lambda data, addr: sent.append((addr, data)), 100, clock=clock, **options)
+    return broadcaster, sent
+
+def lines_sent(sent, addr):
+    return [line for a, data in sent if a == addr for line in data[len(HEADER):].decode().splitlines()]
+
+def test_parse_topics():
+    assert parse_topics("") == ("guesses", "rankings")
+    assert parse_topics(" rankings ") == ("rankings",)
+    assert parse_topics("guesses,bogus") is None
+
+def test_token_depends_on_address(clock):
+    broadcaster, _ = make_broadcaster(clock)
+    token = broadcaster.token(("1.2.3.4", 5))
+    assert broadcaster.check_token(("1.2.3.4", 5), token)
+    assert not broadcaster.check_token(("1.2.3.4", 6), token)
+    assert not broadcaster.check_token(("1.2.3.4", 5), "")
+    assert not broadcaster.check_token(("1.2.3.4", 5), None)
+
+def test_publish_without_subscribers_is_dropped(clock):
+    broadcaster, sent = make_broadcaster(clock)
+    assert not broadcaster.publish("guesses", ["a\n"])
+    assert broadcaster.flush() == 0 and sent == []
+
+def test_subscribers_get_their_topics_only(clock):
+    broadcaster, sent = make_broadcaster(clock)
+    broadcaster.subscribe("g", ("guesses",))
+    broadcaster.subscribe("r", ("rankings",))
+    broadcaster.publish("guesses", ["guess 1\n"])
+    broadcaster.publish("rankings", ["win 1\n"])
+    broadcaster.flush()
+    assert lines_sent(sent, "g") == ["guess 1"]
+    assert lines_sent(sent, "r") == ["win 1"]
+    assert not broadcaster.pending()
+
+def test_same_key_keeps_latest_event(clock):
+    broadcaster, sent = make_broadcaster(clock)
+    broadcaster.subscribe("a", ("rankings",))
+    broadcaster.publish("rankings", ["top v1\n"], key=("top", 4))
+    broadcaster.publish("rankings", ["top v2\n"], key=("top", 4))
+    broadcaster.flush()
+    assert lines_sent(sent, "a") == ["top v2"]
+
+def test_slow_subscriber_drops_oldest(clock):
+    broadcaster, sent = make_broadcaster(clock, capacity=3)
+    broadcaster.subscribe("a", ("guesses",))
+    for i in range(5):
+        broadcaster.publish("guesses", [f"e{i}\n"])
+    broadcaster.flush()
+    assert lines_sent(sent, "a") == ["e2", "e3", "e4"]
+    assert broadcaster.total_dropped() == 2
+
+def test_packets_per_flush_are_limited(clock):
+    broadcaster, sent = make_broadcaster(clock, max_packets=2)
+    broadcaster.subscribe("a", ("guesses",))
+    for i in range(10):
+        broadcaster.publish("guesses", ["x" * 60 + "\n"])
+    broadcaster.flush()
+    assert len(sent) <= 3 and broadcaster.pending()  # 最後一個事件可能多用一個封包
+    while broadcaster.pending():
+        broadcaster.flush()
+    assert len(lines_sent(sent, "a")) == 10
+    assert all(len(data) <= len(HEADER) + 100 for _, data in sent)
+
+def test_subscriber_limit_and_lease_expiry(clock):
+    broadcaster, _ = make_broadcaster(clock, max_subscribers=2, lease=10)
+    assert broadcaster.subscribe("a", ("guesses",))
+    clock.now = 5
+    assert broadcaster.subscribe("b", ("guesses",))
+    assert broadcaster.subscribe("c", ("guesses",)) is None
+    clock.now = 8
+    assert broadcaster.subscribe("a", ("guesses",))  # 續約不受上限影響
+    clock.now = 16
+    broadcaster.prune()
+    assert set(broadcaster.subscribers) == {"a"}
+    assert broadcaster.subscribe("c", ("guesses",))
+    assert not broadcaster.wants("rankings") and broadcaster.wants("guesses")
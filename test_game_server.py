@@ -0,0 +1,241 @@
+import asyncio
+import threading
+
+import wire
+from game_server import GameServer
+from ranking_store import RankingStore
+
+ADDR = ("127.0.0.1", 40000)
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data.decode(errors="replace"))
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def close(self):
+        pass
+
+class GatedBackend:
+    # 直到 release 才載入完成 (或失敗) 的儲存後端
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.error = error
+        self.rows = []
+
+    def load(self):
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return []
+
+    def append(self, row):
+        self.rows.append(row)
+        return False
+
+    def compact(self, rows):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+async def start_server(backend):
+    server = GameServer(default_answer="0123", rankings=RankingStore(backend))
+    server.loop = asyncio.get_running_loop()
+    server.transport = FakeTransport()
+    server.rankings.load_in_background()
+    server.check_rankings_loaded()
+    for packet in (b"[Connecting]: x", b"[Guess]: 0123 #1"):
+        server.handle_datagram(packet, ADDR)
+    return server
+
+async def wait_for(predicate):
+    for _ in range(100):
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+def test_win_reported_while_loading_is_recorded_after_load():
+    async def run():
+        backend = GatedBackend()
+        server = await start_server(backend)
+        server.handle_datagram(b"[USERINFO]->player #2", ADDR)
+        server.handle_datagram(b"[USERINFO]->player #2", ADDR)  # 重送
+        server.handle_datagram(b"[Rankings]: top #3", ADDR)
+        assert not any(text.startswith("[Congratulations!]") for text in server.transport.sent)
+        assert server.transport.sent[-1].startswith("[Error]: 排行榜載入中")
+        backend.release.set()
+        assert await wait_for(lambda: server.rankings_ready)
+        replies = [text for text in server.transport.sent if text.startswith("[Congratulations!]")]
+        assert len(replies) == 1 and "第 1名" in replies[0]
+        assert [row["name"] for row in backend.rows] == ["player"]
+        server.stop()
+    asyncio.run(run())
+
+def test_failed_load_refuses_wins_without_persisting():
+    async def run():
+        backend = GatedBackend(error=OSError("disk error"))
+        server = await start_server(backend)
+        server.handle_datagram(b"[USERINFO]->player #2", ADDR)
+        backend.release.set()
+        assert await wait_for(lambda: server.rankings_error is not None)
+        assert server.transport.sent[-1].startswith("[Error]: 排行榜載入失敗")
+        server.handle_datagram(b"[Rankings]: top #3", ADDR)
+        assert server.transport.sent[-1].startswith("[Error]: 排行榜載入失敗")
+        assert backend.rows == []
+        server.stop()
+    asyncio.run(run())
+
+def test_subscribe_requires_token_echo():
+    server = GameServer(default_answer="0123")
+    server.transport = FakeTransport()
+    spectator = ("10.0.0.9", 5555)
+    server.handle_datagram(b"[Subscribe]: guesses", spectator)
+    reply = server.transport.sent[-1]
+    assert reply.startswith("[Subscribed]: guesses;token=") and "lease" not in reply
+    assert len(server.broadcaster) == 0
+    token = reply.split("token=")[1]
+    server.handle_datagram(b"[Subscribe]: guesses;token=0000000000000000", spectator)
+    assert len(server.broadcaster) == 0
+    server.handle_datagram(f"[Subscribe]: guesses;token={token}".encode(), spectator)
+    assert "lease=" in server.transport.sent[-1] and len(server.broadcaster) == 1
+    server.handle_datagram(b"[Unsubscribe]", spectator)
+    assert len(server.broadcaster) == 1
+    server.handle_datagram(f"[Unsubscribe]: token={token}".encode(), spectator)
+    assert len(server.broadcaster) == 0
+
+def test_workers_refuse_subscriptions():
+    server = GameServer(default_answer="0123", spectators=False)
+    server.transport = FakeTransport()
+    server.handle_datagram(b"[Subscribe]: guesses", ADDR)
+    assert server.transport.sent[-1].startswith("[Error]")
+
+def test_host_limit_covers_all_ports():
+    server = GameServer(default_answer="0123", rate_limit=200, host_rate_limit=1000)
+    server.transport = FakeTransport()
+    admitted = sum(server.admit(b"[Guess]: 0123 #1", ("10.0.0.1", port)) for port in range(20000, 30000))
+    assert 2000 <= admitted < 2200  # host bucket 的 burst (2 秒份)，加上執行期間補充的 token
+    assert server.metrics.counters["dropped.host_rate_limited"] == 10000 - admitted
+    local = sum(server.admit(b"[Guess]: 0123 #1", ("127.0.0.1", port)) for port in range(20000, 30000))
+    assert local == 10000  # 本機只受每個位址的限制
+
+def test_duplicate_guess_resends_cached_reply():
+    server = GameServer(default_answer="0123")
+    server.transport = FakeTransport()
+    server.handle_datagram(b"[Connecting]: x", ADDR)
+    server.handle_datagram(b"[Guess]: 4567 #1", ADDR)
+    server.handle_datagram(b"[Guess]: 0132 #2", ADDR)
+    session = server.sessions[ADDR]
+    assert session.guess_count == 2
+    reply = server.transport.sent[-1]
+    assert reply == "[Guess Reply]: 2A2B #2"
+    server.handle_datagram(b"[Guess]: 0132 #2", ADDR)  # 重送：回覆上次的結果，不重新計分
+    assert server.transport.sent[-1] == reply and session.guess_count == 2
+    sent = len(server.transport.sent)
+    server.handle_datagram(b"[Guess]: 4567 #1", ADDR)  # 更舊的序號直接丟棄
+    assert len(server.transport.sent) == sent and session.guess_count == 2
+    assert server.metrics.counters["duplicates"] == 2
+    server.handle_datagram(b"[Guess]: 0123 #3", ADDR)
+    assert server.transport.sent[-1] == "[Guess Reply]: 恭喜猜對了!4A0B #3" and session.guess_count == 3
+
+def test_userinfo_name_is_sanitized():
+    async def run():
+        backend = GatedBackend()
+        backend.release.set()
+        server = await start_server(backend)
+        assert await wait_for(lambda: server.rankings_ready)
+        server.handle_datagram("[USERINFO]->\x1b[2Jev;il #9\n #2".encode(), ADDR)
+        assert [row["name"] for row in backend.rows] == ["[2Jevil 9"]
+        assert server.transport.sent[-1].endswith(" #2")
+        server.stop()
+    asyncio.run(run())
+
+def test_userinfo_name_of_only_separators_is_rejected():
+    async def run():
+        backend = GatedBackend()
+        backend.release.set()
+        server = await start_server(backend)
+        assert await wait_for(lambda: server.rankings_ready)
+        server.handle_datagram(b"[USERINFO]->;#\x07 #2", ADDR)
+        assert backend.rows == []
+        assert server.transport.sent[-1].startswith("[Error]: 請提供使用者名稱")
+        server.stop()
+    asyncio.run(run())
+
+def test_rankings_require_token_from_ack():
+    async def run():
+        backend = GatedBackend()
+        backend.release.set()
+        server = await start_server(backend)
+        assert await wait_for(lambda: server.rankings_ready)
+        server.handle_datagram(b"[USERINFO]->player #2", ADDR)
+        token = server.transport.sent[0].split("token=")[1]
+        spoofed = ("10.0.0.9", 5555)
+        count = len(server.transport.sent)
+        server.handle_datagram(f"[Rankings]: top;k=100;token={token} #1".encode(), spoofed)
+        assert len(server.transport.sent) == count + 1  # 未確認的位址只收到一個短封包
+        reply = server.transport.sent[-1]
+        assert reply.startswith("[Rankings]: token=") and token not in reply and len(reply) < 64
+        server.handle_datagram(f"[Rankings]: top;k=100;token={token} #3".encode(), ADDR)
+        assert server.transport.sent[-1].startswith("[Rankings]: 1/1") and "player" in server.transport.sent[-1]
+        assert server.metrics.counters["rankings.challenged"] == 1
+        server.stop()
+    asyncio.run(run())
+
+def test_replay_answers_are_used_in_order():
+    server = GameServer(auto_length=4, replay_answers={"10.0.0.1:5000": ["0123", "AB"]})
+    server.transport = FakeTransport()
+    server.handle_datagram(b"[Connecting]: x;replay=10.0.0.1:5000", ADDR)
+    assert server.sessions[ADDR].answer == "0123"
+    server.handle_datagram(b"[Replay]: x #1", ADDR)
+    assert server.sessions[ADDR].answer == "AB"
+    server.handle_datagram(b"[Replay]: x #2", ADDR)
+    assert len(server.sessions[ADDR].answer) == 4  # 錄到的答案用完後改為自動出題
+    other = ("127.0.0.1", 40001)
+    server.handle_datagram(b"[Connecting]: x;replay=10.0.0.2:5000", other)
+    assert len(server.sessions[other].answer) == 4
+
+class LogCollector:
+    def __init__(self):
+        self.lines = []
+
+    def on_log(self, text, tag=None):
+        self.lines.append(text)
+
+def test_session_limit_drops_new_addresses():
+    server = GameServer(default_answer="0123", max_sessions=2)
+    server.transport = FakeTransport()
+    for port in (40000, 40001, 40002):
+        server.handle_datagram(b"[Connecting]: x", ("127.0.0.1", port))
+    server.handle_datagram(b"[Replay]: x #1", ("127.0.0.1", 40003))
+    assert len(server.sessions) == 2
+    assert server.metrics.counters["dropped.session_limit"] == 2
+    server.handle_datagram(b"[Connecting]: x", ("127.0.0.1", 40000))  # 已有 session 的位址不受影響
+    assert server.metrics.counters["dropped.session_limit"] == 2
+    server.handle_datagram(b"QUIT", ("127.0.0.1", 40001))
+    server.handle_datagram(b"[Connecting]: x", ("127.0.0.1", 40002))
+    assert ("127.0.0.1", 40002) in server.sessions
+
+def test_malformed_requests_are_counted_without_logging():
+    server = GameServer(default_answer="0123")
+    server.transport = FakeTransport()
+    server.handle_datagram(b"[Connecting]: x;proto=" + wire.CAPABILITY.encode(), ADDR)
+    session_id = server.sessions[ADDR].session_id
+    log = LogCollector()
+    server.add_observer(log)
+    sent = len(server.transport.sent)
+    server.handle_datagram(b"[USERINFO] player #2", ADDR)
+    server.handle_datagram(wire.pack(wire.OP_GUESS, session_id, b"\x00"), ADDR)
+    server.handle_datagram(wire.pack(wire.OP_REPLAY, session_id), ADDR)
+    assert server.metrics.counters["dropped.malformed"] == 3
+    assert server.metrics.counters["errors"] == 0
+    assert not any(line.startswith("[Error]") for line in log.lines)
+    assert len(server.transport.sent) == sent
@@ -0,0 +1,26 @@
+from metrics import Histogram, Metrics
+
+def test_percentile_is_bucket_upper_bound():
+    h = Histogram()
+    for _ in range(99):
+        h.observe(0.000010)  # 10 µs → 小於 16 µs 的 bucket
+    h.observe(0.001)
+    assert h.percentile(50) == 16e-6
+    assert h.percentile(100) == 0.001  # 上界 1024 µs 超過最大值，以最大值為準
+
+def test_percentile_not_above_max():
+    h = Histogram()
+    h.observe(0.0000976)
+    snapshot = h.snapshot()
+    assert snapshot["p50_ms"] <= snapshot["max_ms"]
+    assert h.percentile(99) == 0.0000976
+
+def test_snapshot_counters_and_gauges():
+    metrics = Metrics()
+    metrics.count("packets.guess")
+    metrics.count("packets.guess", 2)
+    metrics.gauge("sessions", lambda: 7)
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"packets.guess": 3}
+    assert snapshot["gauges"] == {"sessions": 7}
+    assert metrics.snapshot()["histograms"] == {}
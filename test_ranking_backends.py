@@ -0,0 +1,50 @@
+import json
+
+from ranking_backends import JsonlBackend, SqliteBackend, read_log
+from ranking_store import RankingStore
+
+def make_row(i, name="玩家"):
+    return {"name": f"{name}{i}", "length": 4, "guesses": 5, "time": float(i), "finish_time": f"2024-01-01 00:00:{i:02d}"}
+
+def write_torn_log(path, count):
+    # count 筆完整紀錄，最後一行在中文字中間被截斷
+    with open(path, "wb") as f:
+        for i in range(count):
+            f.write((json.dumps(make_row(i), ensure_ascii=False) + "\n").encode())
+        f.write('{"name": "玩'.encode()[:-1])
+
+def test_read_log_skips_torn_multibyte_line(tmp_path):
+    path = tmp_path / "rankings.jsonl"
+    write_torn_log(path, 5)
+    assert [row["name"] for row in read_log(path)] == [f"玩家{i}" for i in range(5)]
+
+def test_jsonl_compact_keeps_rows_before_torn_line(tmp_path):
+    path = tmp_path / "rankings.jsonl"
+    write_torn_log(path, 5)
+    store = RankingStore(JsonlBackend(str(path), str(tmp_path / "rankings.json"), compact_every=3))
+    store.load()
+    for i in range(5, 8):
+        store.insert(make_row(i))
+    store.close()
+    assert len(read_log(path)) == 8
+
+def test_sqlite_migrates_log_with_torn_line(tmp_path):
+    log_path = tmp_path / "rankings.jsonl"
+    write_torn_log(log_path, 5)
+    backend = SqliteBackend(str(tmp_path / "rankings.db"), str(log_path), str(tmp_path / "rankings.json"))
+    try:
+        assert len(backend.load()) == 5
+    finally:
+        backend.close()
+
+def test_sqlite_appends_survive_reopen(tmp_path):
+    db_path = str(tmp_path / "rankings.db")
+    backend = SqliteBackend(db_path, str(tmp_path / "none.jsonl"), str(tmp_path / "none.json"))
+    backend.load()
+    backend.append(make_row(1))
+    backend.close()
+    backend = SqliteBackend(db_path, str(tmp_path / "none.jsonl"), str(tmp_path / "none.json"))
+    try:
+        assert [row["name"] for row in backend.load()] == ["玩家1"]
+    finally:
+        backend.close()
@@ -0,0 +1,100 @@
+import pytest
+
+from ranking_backends import JsonlBackend
+from ranking_store import RankingPartition, RankingStore
+
+def make_row(name, time, guesses=5, length=4, finish_time="2024-01-01 00:00:00"):
+    return {"name": name, "length": length, "guesses": guesses, "time": time, "finish_time": finish_time}
+
+def make_store(tmp_path, rows=()):
+    store = RankingStore(JsonlBackend(str(tmp_path / "rankings.jsonl"), str(tmp_path / "rankings.json")))
+    store.load()
+    for row in rows:
+        store.insert(row)
+    return store
+
+def test_partition_insert_returns_rank():
+    partition = RankingPartition()
+    assert partition.insert(make_row("a", 3.0)) == 1
+    assert partition.insert(make_row("b", 1.0)) == 1
+    assert partition.insert(make_row("c", 2.0)) == 2
+    assert partition.insert(make_row("d", 2.0, guesses=3)) == 2
+    assert [row["name"] for row in partition.rows] == ["b", "d", "c", "a"]
+
+def test_equal_keys_rank_in_insert_order():
+    partition = RankingPartition()
+    first, second = make_row("a", 1.0), make_row("b", 1.0)
+    partition.insert(first)
+    assert partition.insert(second) == 2
+    assert partition.rank_of(first) == 1
+    assert partition.rank_of(second) == 2
+
+def test_insert_ranks_within_length(tmp_path):
+    store = make_store(tmp_path, [make_row("a", 5.0, length=4), make_row("b", 9.0, length=3)])
+    assert store.insert(make_row("c", 7.0, length=3)) == 1
+    assert store.insert(make_row("d", 6.0, length=4)) == 2
+    assert len(store) == 4
+
+def test_query_top_pages(tmp_path):
+    store = make_store(tmp_path, [make_row(f"p{i}", float(i)) for i in range(25)])
+    assert [rank for rank, _ in store.query("top", k=10, offset=20, length=4)] == [21, 22, 23, 24, 25]
+    assert store.query("top", length=3) == []
+
+def test_query_user_uses_best_record(tmp_path):
+    store = make_store(tmp_path, [make_row("a", 4.0), make_row("b", 2.0), make_row("a", 3.0), make_row("a", 9.0)])
+    assert [(rank, row["time"]) for rank, row in store.query("user", name="a", length=4)] == [(2, 3.0)]
+    assert store.query("user", name="x", length=4) == []
+
+def test_query_around(tmp_path):
+    store = make_store(tmp_path, [make_row(f"p{i}", float(i)) for i in range(10)])
+    rows = store.query("around", name="p5", k=2, length=4)
+    assert [row["name"] for _, row in rows] == ["p3", "p4", "p5", "p6", "p7"]
+
+def test_query_cache_cleared_on_insert(tmp_path):
+    store = make_store(tmp_path, [make_row("a", 5.0)])
+    assert len(store.query("top", length=4)) == 1
+    store.insert(make_row("b", 1.0))
+    assert [row["name"] for _, row in store.query("top", length=4)] == ["b", "a"]
+
+def test_reload_from_log(tmp_path):
+    make_store(tmp_path, [make_row("a", 5.0), make_row("b", 1.0, length=3)]).close()
+    store = make_store(tmp_path)
+    assert [row["name"] for row in store] == ["b", "a"]
+
+class FailingBackend:
+    def __init__(self):
+        self.appended = []
+        self.compacted = False
+
+    def load(self):
+        raise UnicodeDecodeError("utf-8", b"\xe7", 0, 1, "unexpected end of data")
+
+    def append(self, row):
+        self.appended.append(row)
+        return True
+
+    def compact(self, rows):
+        self.compacted = True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_failed_background_load_refuses_writes_and_queries():
+    backend = FailingBackend()
+    store = RankingStore(backend)
+    store.load_in_background()
+    store.loaded.wait(5)
+    loaded, error = store.load_status()
+    assert loaded and "unexpected end of data" in error
+    with pytest.raises(RuntimeError):
+        store.insert(make_row("a", 1.0))
+    with pytest.raises(RuntimeError):
+        store.query("top", length=4)
+    assert backend.appended == [] and not backend.compacted
+
+def test_load_status_while_loading():
+    store = RankingStore(FailingBackend())
+    assert store.load_status() == (False, None)
@@ -0,0 +1,27 @@
+from rate_limit import TokenBuckets
+
+def test_burst_then_refill(clock):
+    buckets = TokenBuckets(rate=10, burst=5, clock=clock)
+    assert sum(buckets.allow("a") for _ in range(20)) == 5
+    clock.now += 0.5
+    assert sum(buckets.allow("a") for _ in range(20)) == 5
+    assert buckets.allow("b")  # 其他 key 不受影響
+
+def test_prune_removes_only_full_buckets(clock):
+    buckets = TokenBuckets(rate=10, burst=5, clock=clock)
+    buckets.allow("idle")
+    clock.now += 1
+    for _ in range(10):
+        buckets.allow("busy")
+    buckets.prune()
+    assert set(buckets.buckets) == {"busy"}
+
+def test_full_table_evicts_oldest_not_throttled(clock):
+    buckets = TokenBuckets(rate=0.1, burst=2, max_keys=16, clock=clock)
+    for _ in range(3):
+        buckets.allow("flooder")
+    for port in range(100):
+        clock.now += 0.01
+        buckets.allow(("spoofed", port))
+        assert not buckets.allow("flooder")  # 被限制的來源不會因為表格滿了而重新取得額度
+        assert len(buckets) <= 16
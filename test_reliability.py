@@ -0,0 +1,50 @@
+from reliability import Retransmitter, SEQ_MODULO, is_newer
+
+def make_retransmitter(clock, **options):
+    sent = []
+    return Retransmitter(sent.append, clock=clock, **options), sent
+
+def test_is_newer_wraps_around():
+    assert is_newer(2, 1)
+    assert not is_newer(1, 1)
+    assert not is_newer(1, 2)
+    assert is_newer(1, SEQ_MODULO - 1)
+    assert not is_newer(SEQ_MODULO - 1, 1)
+
+def test_stop_and_wait(clock):
+    rt, sent = make_retransmitter(clock)
+    first = rt.submit(lambda seq: f"a#{seq}")
+    second = rt.submit(lambda seq: f"b#{seq}")
+    assert sent == [f"a#{first}"]
+    assert not rt.ack(second)
+    assert rt.ack(first)
+    assert sent == [f"a#{first}", f"b#{second}"]
+    assert not rt.ack(first)  # 重複的回覆
+
+def test_retransmit_with_backoff(clock):
+    rt, sent = make_retransmitter(clock, initial_rto=1.0, max_rto=3.0, max_attempts=10)
+    rt.submit(lambda seq: "x")
+    times = []
+    while len(sent) < 5:
+        clock.now += 0.5
+        if rt.poll() is None and len(sent) > len(times) + 1:
+            times.append(clock.now)
+    assert times == [1.0, 3.0, 6.0, 9.0]
+
+def test_gives_up_after_max_attempts_and_sends_next(clock):
+    rt, sent = make_retransmitter(clock, initial_rto=1.0, max_rto=1.0, max_attempts=3)
+    first = rt.submit(lambda seq: "a")
+    rt.submit(lambda seq: "b")
+    given_up = None
+    while given_up is None:
+        clock.now += 1
+        given_up = rt.poll()
+    assert given_up == first
+    assert sent == ["a", "a", "a", "b"]
+
+def test_seq_skips_zero(clock):
+    rt, sent = make_retransmitter(clock)
+    rt.next_seq = SEQ_MODULO - 1
+    assert rt.submit(lambda seq: seq) == SEQ_MODULO - 1
+    rt.clear()
+    assert rt.submit(lambda seq: seq) == 1
@@ -0,0 +1,70 @@
+import itertools
+import random
+import shutil
+
+import pytest
+
+from scoring import DIGIT_VALUE, HEX_DIGITS, AnswerScorer
+from score_table import HEADER, TableScorer, build_table, load_table, permutation_index, table_path
+
+LENGTHS = (1, 2, 3)
+
+@pytest.fixture(scope="module")
+def table_dir(tmp_path_factory):
+    # 長度 1~3 的計分表只產生一次 (長度 3 約 11 MB)
+    directory = str(tmp_path_factory.mktemp("score_tables"))
+    for length in LENGTHS:
+        build_table(length, directory)
+    return directory
+
+@pytest.mark.parametrize("length", LENGTHS + (4,))
+def test_permutation_index_matches_itertools(length):
+    for index, values in enumerate(itertools.permutations(range(len(HEX_DIGITS)), length)):
+        assert permutation_index(values) == index
+
+def test_permutation_index_rejects_repeated_digits():
+    assert permutation_index((1, 2, 1)) is None
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_table_scorer_matches_answer_scorer(table_dir, length):
+    table = load_table(length, table_dir)
+    assert table is not None and table.length == length
+    guesses = ["".join(p) for p in itertools.permutations(HEX_DIGITS, length)]
+    answers = random.Random(length).sample(guesses, min(len(guesses), 40))
+    for answer in answers:
+        expected = AnswerScorer(answer)
+        scorer = TableScorer(answer, table)
+        for guess in guesses:
+            assert scorer.score(guess) == expected.score(guess), (answer, guess)
+            values = tuple(DIGIT_VALUE[c] for c in guess)
+            assert scorer.score_values(values) == expected.score_values(values), (answer, guess)
+
+def test_table_scorer_falls_back_for_repeated_characters(table_dir):
+    scorer = TableScorer("012", load_table(3, table_dir))
+    assert scorer.score("001") == AnswerScorer("012").score("001") == (1, 1)
+
+def test_load_table_missing_file(tmp_path):
+    assert load_table(2, str(tmp_path)) is None
+
+def test_load_table_corrupt_files(table_dir, tmp_path):
+    truncated = tmp_path / "truncated"
+    truncated.mkdir()
+    with open(table_path(2, table_dir), "rb") as f:
+        data = f.read()
+    (truncated / "scores-2.u8").write_bytes(data[:-1])
+    assert load_table(2, str(truncated)) is None
+
+    bad_magic = tmp_path / "bad_magic"
+    bad_magic.mkdir()
+    (bad_magic / "scores-2.u8").write_bytes(b"XXXX" + data[4:])
+    assert load_table(2, str(bad_magic)) is None
+
+    short = tmp_path / "short"
+    short.mkdir()
+    (short / "scores-2.u8").write_bytes(data[:HEADER.size - 1])
+    assert load_table(2, str(short)) is None
+
+    wrong_length = tmp_path / "wrong_length"
+    wrong_length.mkdir()
+    shutil.copy(table_path(1, table_dir), table_path(2, str(wrong_length)))
+    assert load_table(2, str(wrong_length)) is None
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from scoring import DIGIT_VALUE, HEX_DIGITS, AnswerScorer
+
+def baseline_score(answer, guess):
+    # 原本 game_server 的計分方式
+    A = sum(a == b for a, b in zip(guess, answer))
+    B = sum(min(guess.count(x), answer.count(x)) for x in set(guess)) - A
+    return A, B
+
+def random_cases(count=2000, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        length = rng.randint(1, 16)
+        answer = "".join(rng.sample(HEX_DIGITS, length))
+        if rng.random() < 0.5:
+            guess = "".join(rng.sample(HEX_DIGITS, length))
+        else:
+            guess = "".join(rng.choice(HEX_DIGITS) for _ in range(length))  # 可能有重複字元
+        yield answer, guess
+
+def test_score_matches_baseline():
+    for answer, guess in random_cases():
+        assert AnswerScorer(answer).score(guess) == baseline_score(answer, guess), (answer, guess)
+
+def test_score_values_matches_baseline():
+    for answer, guess in random_cases():
+        values = [DIGIT_VALUE[c] for c in guess]
+        assert AnswerScorer(answer).score_values(values) == baseline_score(answer, guess), (answer, guess)
+
+def test_score_many_matches_baseline():
+    rng = random.Random(2)
+    answer = "".join(rng.sample(HEX_DIGITS, 4))
+    guesses = ["".join(rng.choice(HEX_DIGITS) for _ in range(4)) for _ in range(500)]
+    assert AnswerScorer(answer).score_many(guesses) == [baseline_score(answer, g) for g in guesses]
+
+def test_repeated_characters():
+    assert AnswerScorer("0123").score("0011") == baseline_score("0123", "0011") == (1, 1)
+
+def test_is_win():
+    scorer = AnswerScorer("AB")
+    assert scorer.is_win(scorer.score("AB"))
+    assert not scorer.is_win(scorer.score("BA"))
+
+@pytest.mark.parametrize("guess", ["012G", "01 3", "abcd", "０１２３"])
+def test_non_hex_guess_raises(guess):
+    with pytest.raises(ValueError):
+        AnswerScorer("0123").score(guess)
+
+@pytest.mark.parametrize("answer", ["0012", "01X3"])
+def test_invalid_answer_raises(answer):
+    with pytest.raises(ValueError):
+        AnswerScorer(answer)
@@ -0,0 +1,18 @@
+from session_log import EventRecorder, read_records, recorded_answers
+
+def test_ready_answers_are_recorded_in_order(tmp_path, clock):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = EventRecorder(path, clock)
+    first, second = ("127.0.0.1", 40000), ("127.0.0.1", 40001)
+    recorder.record("in", first, b"[Connecting]: x")
+    clock.now = 1.0
+    recorder.record("out", first, "[Ready]: 4，開始".encode(), "0123")
+    recorder.record("out", second, "[Ready]: 2，開始".encode(), "AB")
+    clock.now = 2.0
+    recorder.record("out", first, "[Ready]: 3，開始".encode(), "F0E")
+    recorder.record("out", first, b"[Guess Reply]: 0A0B #1")
+    recorder.close()
+    records = read_records(path)
+    assert [record["event"] for record in records] == ["connect", "ready", "ready", "ready", "reply"]
+    assert "answer" not in records[0] and "answer" not in records[-1]
+    assert recorded_answers(records) == {"127.0.0.1:40000": ["0123", "F0E"], "127.0.0.1:40001": ["AB"]}
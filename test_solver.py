@@ -0,0 +1,81 @@
+import itertools
+import random
+
+import pytest
+
+import solver
+from scoring import HEX_DIGITS, AnswerScorer
+from solver import Solver
+
+def play(length, answer, max_guesses=len(HEX_DIGITS), seed=0):
+    # 以 AnswerScorer 回覆 Solver 的猜測，回傳 (是否猜中, solver)
+    bot = Solver(length, rng=random.Random(seed))
+    scorer = AnswerScorer(answer)
+    for _ in range(max_guesses):
+        guess = bot.next_guess()
+        A, B = scorer.score(guess)
+        if A == length:
+            return True, bot
+        bot.update(guess, A, B)
+    return False, bot
+
+def random_answers(length, count, seed=1):
+    rng = random.Random(seed)
+    return ["".join(rng.sample(HEX_DIGITS, length)) for _ in range(count)]
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4])
+def test_wins_with_table(length):
+    for answer in random_answers(length, 5):
+        won, bot = play(length, answer)
+        assert bot.materialized
+        assert won, answer
+
+@pytest.mark.parametrize("length", [3, 4])
+def test_wins_with_stream(monkeypatch, length):
+    monkeypatch.setattr(solver, "MATERIALIZE_LIMIT", solver.permutation_count(length) - 1)
+    for answer in random_answers(length, 5):
+        won, bot = play(length, answer)
+        assert not bot.materialized
+        assert won, answer
+
+def consistent(candidate, history):
+    scorer = AnswerScorer(candidate)
+    return all(scorer.score(guess) == (A, B) for guess, A, B in history)
+
+def test_update_prunes_to_consistent_candidates():
+    length = 3
+    answer = "A7C"
+    bot = Solver(length, rng=random.Random(3))
+    scorer = AnswerScorer(answer)
+    history = []
+    for guess in ["012", "7AC", "C7A"]:
+        A, B = scorer.score(guess)
+        bot.update(guess, A, B)
+        history.append((guess, A, B))
+        remaining = {Solver.to_text(solver.candidate_table(length).digits[i]) for i in bot.candidates}
+        expected = {"".join(p) for p in itertools.permutations(HEX_DIGITS, length) if consistent("".join(p), history)}
+        assert remaining == expected
+        assert answer in remaining
+        assert bot.remaining() == len(expected)
+
+def test_stream_yields_only_consistent_candidates(monkeypatch):
+    monkeypatch.setattr(solver, "MATERIALIZE_LIMIT", 0)
+    length = 3
+    scorer = AnswerScorer("5E1")
+    bot = Solver(length, rng=random.Random(4))
+    history = []
+    for guess in ["012", "345", "E51"]:
+        A, B = scorer.score(guess)
+        bot.update(guess, A, B)
+        history.append((guess, A, B))
+    found = {Solver.to_text(c) for c in bot.iter_consistent()}
+    expected = {"".join(p) for p in itertools.permutations(HEX_DIGITS, length) if consistent("".join(p), history)}
+    assert found == expected
+    assert bot.remaining() is None
+
+def test_no_candidate_raises():
+    bot = Solver(2)
+    bot.update("01", 2, 0)
+    bot.update("01", 0, 0)
+    with pytest.raises(ValueError):
+        bot.next_guess()
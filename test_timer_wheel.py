@@ -0,0 +1,44 @@
+from timer_wheel import TimerWheel
+
+def make_wheel(clock, timeout=5, tick=1.0):
+    expired = []
+    return TimerWheel(timeout, expired.append, tick, clock), expired
+
+def test_expires_after_timeout(clock):
+    wheel, expired = make_wheel(clock)
+    wheel.touch("a")
+    clock.now += 4.5
+    assert wheel.advance() == []
+    clock.now += 1
+    assert wheel.advance() == ["a"]
+    assert expired == ["a"] and len(wheel) == 0
+
+def test_touch_postpones_deadline(clock):
+    wheel, expired = make_wheel(clock)
+    wheel.touch("a")
+    for _ in range(10):
+        clock.now += 3
+        wheel.advance()
+        wheel.touch("a")
+    assert expired == []
+    clock.now += 6
+    wheel.advance()
+    assert expired == ["a"]
+
+def test_discard_stops_tracking(clock):
+    wheel, expired = make_wheel(clock)
+    wheel.touch("a")
+    wheel.discard("a")
+    clock.now += 10
+    wheel.advance()
+    assert expired == [] and len(wheel) == 0
+
+def test_long_gap_expires_everything(clock):
+    # 超過整圈 slot 的間隔仍會處理所有 key
+    wheel, expired = make_wheel(clock)
+    for key in range(20):
+        wheel.touch(key)
+        clock.now += 0.3
+    clock.now += 100
+    wheel.advance()
+    assert sorted(expired) == list(range(20))
@@ -0,0 +1,63 @@
+import struct
+
+import pytest
+
+import wire
+
+def test_guess_round_trip_1_and_16_nibbles():
+    for values in ([7], list(range(16)), list(range(15, -1, -1))):
+        data = wire.pack_guess(12345, 65535, values)
+        assert wire.is_binary(data)
+        opcode, session_id, body = wire.unpack(data)
+        assert (opcode, session_id) == (wire.OP_GUESS, 12345)
+        assert wire.unpack_guess(body) == (65535, values)
+
+def test_guess_length_above_16_rejected():
+    body = wire.GUESS_BODY.pack(1, 17, 0)
+    with pytest.raises(struct.error):
+        wire.unpack_guess(body)
+
+def test_short_frames_raise_struct_error():
+    with pytest.raises(struct.error):
+        wire.unpack_guess(b"\x00\x01")
+    with pytest.raises(struct.error):
+        wire.unpack_seq(b"")
+
+def test_reply_and_error():
+    opcode, session_id, body = wire.unpack(wire.pack_reply(9, 42, 3, 1))
+    assert (opcode, session_id) == (wire.OP_REPLY, 9)
+    assert wire.REPLY_BODY.unpack(body) == (42, 3, 1)
+    opcode, _, body = wire.unpack(wire.pack_error(9, 43, "[Error]: 錯誤"))
+    assert opcode == wire.OP_ERROR
+    assert wire.unpack_seq(body) == 43
+    assert body[wire.SEQ_BODY.size:].decode() == "[Error]: 錯誤"
+
+def test_ready_and_seq_packets():
+    _, _, body = wire.unpack(wire.pack_ready(1, 4))
+    assert wire.READY_BODY.unpack(body) == (4,)
+    opcode, _, body = wire.unpack(wire.pack_seq(wire.OP_ACK, 1, 7))
+    assert (opcode, wire.unpack_seq(body)) == (wire.OP_ACK, 7)
+
+def test_is_binary():
+    assert wire.is_binary(wire.pack(wire.OP_QUIT, 1))
+    assert not wire.is_binary(b"[Guess]: 0123 #1")
+    assert not wire.is_binary(bytes([wire.MAGIC, 1]))  # 比 header 短
+    assert not wire.is_binary("玩".encode())
+
+def test_seq_suffix_round_trip():
+    assert wire.with_seq("[Guess]: 0123", 5) == "[Guess]: 0123 #5"
+    assert wire.with_seq("[Guess]: 0123", None) == "[Guess]: 0123"
+    assert wire.split_seq("[Guess]: 0123 #5") == ("[Guess]: 0123", 5)
+    assert wire.split_seq("[Guess]: 0123") == ("[Guess]: 0123", None)
+    assert wire.split_seq("[Guess]: 0123 #x") == ("[Guess]: 0123 #x", None)
+    assert wire.split_seq(wire.with_seq("[Congratulations!]: a\n", 3)) == ("[Congratulations!]: a", 3)
+
+def test_parse_score():
+    assert wire.parse_score("[Guess Reply]: 1A2B") == (1, 2)
+    assert wire.parse_score("[Guess Reply]: 恭喜猜對了!4A0B") == (4, 0)
+    assert wire.parse_score("[Guess Reply]: [Error]: 格式錯誤，請輸入4位數字") is None
+    assert wire.parse_score("AB") is None
+
+def test_parse_options():
+    assert wire.parse_options("[Ack]: Server已啟動;proto=bin1;sid=3") == {"proto": "bin1", "sid": "3"}
+    assert wire.parse_options("[Connecting]: x") == {}
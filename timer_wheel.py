@@ -0,0 +1,70 @@
+"""閒置期限用的 timer wheel
+
+所有 key 共用同一個 timeout，因此以 tick 為刻度把期限放進環狀的 slot。
+touch() 只更新 dict 中的期限 (O(1)，不建立執行緒也不重新排程)；輪到某個
+slot 時才檢查裡面的 key，期限已被延後的就搬到新的 slot，真的到期的才呼叫
+callback。advance() 由呼叫端的主迴圈定期驅動 (asyncio call_later 或 Tk after)。
+"""
+
+import math
+import threading
+import time
+
+class TimerWheel:
+    def __init__(self, timeout, callback, tick=1.0, clock=time.monotonic):
+        self.timeout = timeout  # 閒置多久算到期 (秒)
+        self.callback = callback  # 到期時呼叫 callback(key)
+        self.tick = tick  # 每個 slot 代表的時間長度 (秒)
+        self.clock = clock
+        self.slots = [set() for _ in range(math.ceil(timeout / tick) + 1)]
+        self.deadlines = {}  # key -> 到期時間
+        self.last_index = int(clock() / tick)  # 上次處理到的刻度
+        self.lock = threading.Lock()  # touch() 可能來自其他執行緒
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def slot_of(self, deadline, after_index=None):
+        # 找出 deadline 所在的 slot；after_index 之前(含)的刻度已處理過，改放到下一格
+        index = int(deadline / self.tick)
+        if after_index is not None and index <= after_index:
+            index = after_index + 1
+        return self.slots[index % len(self.slots)]
+
+    def touch(self, key):
+        # 重新開始計算 key 的閒置時間
+        deadline = self.clock() + self.timeout
+        with self.lock:
+            if key not in self.deadlines:
+                self.slot_of(deadline).add(key)
+            self.deadlines[key] = deadline
+
+    def discard(self, key):
+        # 不再追蹤 key，留在 slot 中的舊項目會在輪到時自動略過
+        with self.lock:
+            self.deadlines.pop(key, None)
+
+    def advance(self):
+        # 處理從上次到現在經過的所有 slot，並對到期的 key 呼叫 callback
+        now = self.clock()
+        index = int(now / self.tick)
+        expired = []
+        with self.lock:
+            steps = min(index - self.last_index, len(self.slots))
+            for i in range(index - steps + 1, index + 1):
+                slot_index = i % len(self.slots)
+                keys = self.slots[slot_index]
+                self.slots[slot_index] = set()
+                for key in keys:
+                    deadline = self.deadlines.get(key)
+                    if deadline is None:
+                        continue
+                    if deadline <= now:
+                        del self.deadlines[key]
+                        expired.append(key)
+                    else:
+                        self.slot_of(deadline, index).add(key)
+            self.last_index = index
+        for key in expired:
+            self.callback(key)
+        return expired
@@ -0,0 +1,117 @@
+"""精簡的二進位封包格式
+
+client 在 [Connecting] 封包附上 ";proto=bin1" 表示支援二進位格式，server
+若同意就在 [Ack] 回覆 ";proto=bin1;sid=<session id>"，之後雙方改用下列封包；
+沒有附上的舊 client 繼續使用原本的文字封包。
+
+每個封包開頭為 header：magic(1 byte) + opcode(1 byte) + session id(4 bytes)。
+magic 0xB1 在 UTF-8 中只會出現在多位元組字元的中間，不可能是文字封包的
+第一個 byte，所以收到封包時只要看第一個 byte 就能分辨格式。
+
+    READY    長度(1 byte)
+    GUESS    seq(2 bytes) + 長度(1 byte) + 猜測(8 bytes，每個字元 4 bits，第一個字元在最高位)
+    REPLY    seq(2 bytes) + A(1 byte) + B(1 byte)
+    ERROR    seq(2 bytes) + UTF-8 錯誤訊息
+    REPLAY   seq(2 bytes)
+    ACK      seq(2 bytes)
+    TIMEOUT / QUIT  沒有內容
+
+seq 是 client 端的請求序號 (見 reliability.py)，server 的回覆帶回同一個 seq
+作為確認。文字封包則在結尾附上 " #<seq>"，例如 "[Guess]: 0123 #5"。
+"""
+
+import struct
+
+MAGIC = 0xB1
+CAPABILITY = "bin1"  # 協商時使用的格式名稱
+
+OP_READY = 1
+OP_GUESS = 2
+OP_REPLY = 3
+OP_ERROR = 4
+OP_REPLAY = 5
+OP_TIMEOUT = 6
+OP_QUIT = 7
+OP_ACK = 8
+
+HEADER = struct.Struct("!BBI")
+READY_BODY = struct.Struct("!B")
+SEQ_BODY = struct.Struct("!H")
+GUESS_BODY = struct.Struct("!HBQ")
+REPLY_BODY = struct.Struct("!HBB")
+MAX_NIBBLES = 16  # 猜測最多 16 個字元 (64 bits)
+
+def pack_nibbles(values):
+    # 將最多 16 個 0~15 的數值打包成 64-bit 整數，第一個數值在最高的 4 bits
+    packed = 0
+    for i, v in enumerate(values):
+        packed |= v << (60 - 4 * i)
+    return packed
+
+def unpack_nibbles(packed, length):
+    return [(packed >> (60 - 4 * i)) & 0xF for i in range(length)]
+
+def is_binary(data):
+    return len(data) >= HEADER.size and data[0] == MAGIC
+
+def pack(opcode, session_id, body=b""):
+    return HEADER.pack(MAGIC, opcode, session_id) + body
+
+def unpack(data):
+    """回傳 (opcode, session id, body)，格式錯誤時丟出 struct.error"""
+    _, opcode, session_id = HEADER.unpack_from(data)
+    return opcode, session_id, data[HEADER.size:]
+
+def pack_ready(session_id, length):
+    return pack(OP_READY, session_id, READY_BODY.pack(length))
+
+def pack_seq(opcode, session_id, seq):
+    return pack(opcode, session_id, SEQ_BODY.pack(seq))
+
+def unpack_seq(body):
+    return SEQ_BODY.unpack_from(body)[0]
+
+def pack_guess(session_id, seq, values):
+    return pack(OP_GUESS, session_id, GUESS_BODY.pack(seq, len(values), pack_nibbles(values)))
+
+def unpack_guess(body):
+    """回傳 (seq, 猜測的數值 list)，格式錯誤或長度超過 MAX_NIBBLES 時丟出 struct.error"""
+    seq, length, packed = GUESS_BODY.unpack(body)
+    if length > MAX_NIBBLES:
+        raise struct.error(f"guess length {length} exceeds {MAX_NIBBLES}")
+    return seq, unpack_nibbles(packed, length)
+
+def pack_reply(session_id, seq, A, B):
+    return pack(OP_REPLY, session_id, REPLY_BODY.pack(seq, A, B))
+
+def pack_error(session_id, seq, text):
+    return pack(OP_ERROR, session_id, SEQ_BODY.pack(seq) + text.encode())
+
+def with_seq(text, seq):
+    # 在文字封包結尾加上序號；seq 為 None (舊版 client) 時維持原樣
+    if seq is None:
+        return text
+    return f"{text.rstrip()} #{seq}"
+
+def split_seq(text):
+    """拆出文字封包結尾的 " #<seq>"，回傳 (去掉序號的文字, seq 或 None)"""
+    head, sep, tail = text.rstrip().rpartition(" #")
+    if sep and tail.isdigit():
+        return head, int(tail)
+    return text, None
+
+def parse_score(text):
+    """從 "[Guess Reply]: 1A2B" 或 "恭喜猜對了!4A0B" 取出 (A, B)，不是計分結果時回傳 None"""
+    result = text.rsplit("!", 1)[-1].split(":")[-1].strip()
+    A, sep, B = result.partition("A")
+    if not sep or not B.endswith("B") or not A.isdigit() or not B[:-1].isdigit():
+        return None
+    return int(A), int(B[:-1])
+
+def parse_options(text):
+    # 解析 "...;key=value;key2=value2" 形式的協商參數
+    options = {}
+    for part in text.split(";")[1:]:
+        key, _, value = part.partition("=")
+        options[key.strip()] = value.strip()
+    return options
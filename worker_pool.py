@@ -0,0 +1,133 @@
+"""多程序伺服器
+
+啟動 N 個 worker 程序，每個都以 SO_REUSEPORT 綁定同一個 UDP port，由 kernel
+依 (來源 ip, 來源 port, 目的 ip, 目的 port) 的 hash 把 client 分配到固定的
+worker，因此同一個 client 的 session 一直留在同一個程序。
+
+排行榜只存在主程序：主程序的 RankingService 以單一執行緒依序處理所有 worker
+的請求，worker 則透過 RemoteRankingStore 以 Pipe 呼叫，所有插入與名次都來自
+同一份一致的排行榜。
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from multiprocessing.connection import wait
+
+from ranking_store import RankingStore
+from ranking_backends import BACKENDS, GROUP_COMMIT_DELAY
+
+class RankingService:
+    """在主程序中代替各 worker 操作唯一的 RankingStore"""
+
+    def __init__(self, store, connections):
+        self.store = store
+        self.connections = list(connections)  # 與每個 worker 相連的 Pipe
+
+    def serve(self):
+        # 依序處理 worker 的請求，直到所有 worker 都斷線；閒置時提交排行榜 (group commit)
+        while self.connections:
+            ready = wait(self.connections, timeout=GROUP_COMMIT_DELAY)
+            if not ready:
+                self.store.flush()
+            for conn in ready:
+                try:
+                    name, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    self.connections.remove(conn)
+                    conn.close()
+                    continue
+                try:
+                    result = ("ok", getattr(self.store, name)(*args, **kwargs))
+                except Exception as e:
+                    result = ("error", e)
+                conn.send(result)
+
+class RemoteRankingStore:
+    """worker 端的排行榜代理，方法呼叫會轉送到主程序的 RankingService"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def call(self, name, *args, **kwargs):
+        with self.lock:
+            self.conn.send((name, args, kwargs))
+            status, value = self.conn.recv()
+        if status == "error":
+            raise value
+        return value
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def __len__(self):
+        return self.call("__len__")
+
+    def __iter__(self):
+        return iter(self.call("snapshot"))
+
+    def load(self):
+        pass  # 主程序負責載入
+
+    def load_in_background(self):
+        pass
+
+    def flush(self):
+        pass  # 由主程序的 RankingService 定期提交
+
+    def close(self):
+        pass  # 由主程序負責關閉
+
+def worker_main(index, host, port, conn, server_options, quiet, io_mode):
+    # worker 程序的進入點
+    from game_server import GameServer, serve
+
+    if server_options.get("metrics_file"):
+        server_options = dict(server_options, metrics_file=f"{server_options['metrics_file']}.{index}")
+    if server_options.get("record_file"):
+        server_options = dict(server_options, record_file=f"{server_options['record_file']}.{index}")
+    server_options = dict(server_options, spectators=False)  # 每個 worker 只看得到部分的遊戲，不接受觀戰訂閱
+    server = GameServer(rankings=RemoteRankingStore(conn), **server_options)
+    if not quiet:
+        server.add_observer(WorkerConsoleObserver(index))
+    try:
+        asyncio.run(serve(server, host, port, reuse_port=True, io_mode=io_mode))
+    except KeyboardInterrupt:
+        pass
+
+class WorkerConsoleObserver:
+    """輸出時標示是哪個 worker"""
+
+    def __init__(self, index):
+        self.prefix = f"[Worker {index}]"
+
+    def on_log(self, text, tag=None):
+        print(f"{self.prefix}{text}", end="", flush=True)
+
+def run_workers(count, host, port, server_options, quiet=False, io_mode="asyncio", backend="sqlite"):
+    # 啟動 count 個 worker 與主程序的排行榜服務；server_options 為傳給 GameServer 的參數
+    store = RankingStore(BACKENDS[backend]())
+    store.load_in_background()  # worker 先開始服務，排行榜請求會等到載入完成
+    processes = []
+    connections = []
+    for index in range(count):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=worker_main, args=(index, host, port, child_conn, server_options, quiet, io_mode), daemon=True)
+        process.start()
+        child_conn.close()
+        processes.append(process)
+        connections.append(parent_conn)
+    if not quiet:
+        print(f"[Info]: 已啟動 {count} 個 worker，監聽 {host}:{port}", flush=True)
+
+    try:
+        RankingService(store, connections).serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+        store.close()